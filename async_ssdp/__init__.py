@@ -1,33 +1,98 @@
-from .async_multicast_protocol import AsyncMulticastProtocol, MulticastTransport
-from .event_bus import EventBus
-from .message_builder import MessageBuilder, MessageSubType, MessageType
-from .message_parser import MessageParser
-from .parsed_message import ParsedMessage, ParsedMessageType
-from .ssdp_service import SSDPService
-
-from .ssdp_responder import SSDPResponder
-from .device_registry import DeviceRegistry
-from .periodic_announcer import PeriodicAnnouncer
-
-from .ssdp_client import SSDPClient
-from .ssdp_server import SSDPServer
-
-_exports = [[e.__name__ for e in [
-    AsyncMulticastProtocol,
-    MulticastTransport,
-    EventBus,
-    MessageBuilder,
-    MessageSubType,
-    MessageType,
-    MessageParser,
-    ParsedMessage,
-    ParsedMessageType,
-    SSDPService,
-    SSDPResponder,
-    DeviceRegistry,
-    PeriodicAnnouncer,
-    SSDPClient,
-    SSDPClient
-]]]
-
-__all__ = _exports
\ No newline at end of file
+"""Asynchronous SSDP discovery and announcement
+
+The public names are imported from their submodules on first use, so
+`import async_ssdp` stays cheap for short-lived processes.
+"""
+import importlib
+
+TYPE_CHECKING = False  # typing itself is not cheap to import; type checkers treat this as True
+
+# public name -> submodule it lives in
+_exports = {
+    'AsyncMulticastProtocol': 'async_multicast_protocol',
+    'BaseTransport': 'async_multicast_protocol',
+    'BatchResult': 'async_multicast_protocol',
+    'MulticastTransport': 'async_multicast_protocol',
+    'TransportStats': 'async_multicast_protocol',
+    'CaptureWriter': 'capture',
+    'Replayer': 'capture',
+    'read_capture': 'capture',
+    'ConnectionPool': 'description_fetcher',
+    'DescriptionFetcher': 'description_fetcher',
+    'parse_description': 'description_fetcher',
+    'DuplicateFilter': 'duplicate_filter',
+    'EventBus': 'event_bus',
+    'Subscription': 'event_bus',
+    'IngestQueue': 'ingest_queue',
+    'MessageBuilder': 'message_builder',
+    'MessageSubType': 'message_builder',
+    'MessageType': 'message_builder',
+    'CombinedMatcher': 'message_filter',
+    'MessageFilter': 'message_filter',
+    'MessageParser': 'message_parser',
+    'Histogram': 'metrics',
+    'Metrics': 'metrics',
+    'render_prometheus': 'metrics',
+    'RateLimitedLogger': 'log',
+    'ParsedMessage': 'parsed_message',
+    'ParsedMessageType': 'parsed_message',
+    'SSDPService': 'ssdp_service',
+    'SimulatedFabric': 'simulated_transport',
+    'SimulatedTransport': 'simulated_transport',
+    'SSDPResponder': 'ssdp_responder',
+    'DeviceRecord': 'device_record',
+    'DeviceRegistry': 'device_registry',
+    'ChangeFeed': 'registry_changes',
+    'PeriodicAnnouncer': 'periodic_announcer',
+    'AnnouncementScheduler': 'announcement_scheduler',
+    'RateLimiter': 'announcement_scheduler',
+    'ShardedListener': 'sharded_listener',
+    'SSDPClient': 'ssdp_client',
+    'ContinuousDiscovery': 'continuous_discovery',
+    'SSDPServer': 'ssdp_server',
+    'MultiDeviceServer': 'multi_device_server',
+    'MultiDeviceResponder': 'multi_device_server',
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    module = _exports.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
+
+
+if TYPE_CHECKING:
+    from .async_multicast_protocol import AsyncMulticastProtocol, BaseTransport, BatchResult, MulticastTransport, TransportStats
+    from .capture import CaptureWriter, Replayer, read_capture
+    from .description_fetcher import ConnectionPool, DescriptionFetcher, parse_description
+    from .duplicate_filter import DuplicateFilter
+    from .event_bus import EventBus, Subscription
+    from .ingest_queue import IngestQueue
+    from .message_builder import MessageBuilder, MessageSubType, MessageType
+    from .message_filter import CombinedMatcher, MessageFilter
+    from .message_parser import MessageParser
+    from .metrics import Histogram, Metrics, render_prometheus
+    from .log import RateLimitedLogger
+    from .parsed_message import ParsedMessage, ParsedMessageType
+    from .ssdp_service import SSDPService
+    from .simulated_transport import SimulatedFabric, SimulatedTransport
+    from .ssdp_responder import SSDPResponder
+    from .device_record import DeviceRecord
+    from .device_registry import DeviceRegistry
+    from .registry_changes import ChangeFeed
+    from .periodic_announcer import PeriodicAnnouncer
+    from .announcement_scheduler import AnnouncementScheduler, RateLimiter
+    from .sharded_listener import ShardedListener
+    from .ssdp_client import SSDPClient
+    from .continuous_discovery import ContinuousDiscovery
+    from .ssdp_server import SSDPServer
+    from .multi_device_server import MultiDeviceServer, MultiDeviceResponder
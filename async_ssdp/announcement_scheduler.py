@@ -0,0 +1,148 @@
+import asyncio
+import heapq
+import random
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .log import get_logger
+
+log = get_logger(__name__)
+
+class RateLimiter:
+    """Token bucket shared by everything that sends on one socket
+    
+    acquire(n) reserves n packets and sleeps off any debt, so concurrent
+    senders together stay under `rate` packets per second, with bursts of
+    up to `burst`.
+    """
+    
+    def __init__(self, rate: float = 200.0, burst: int = 20):
+        self.rate = rate
+        self.burst = burst
+        self.waited = 0.0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+    
+    async def acquire(self, count: int = 1):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate) - count
+        self._updated = now
+        if self._tokens < 0:
+            delay = -self._tokens / self.rate
+            self.waited += delay
+            await asyncio.sleep(delay)
+    
+    async def send(self, send_many: Callable, messages: List):
+        """Send messages through send_many in bursts the bucket allows"""
+        for i in range(0, len(messages), self.burst):
+            chunk = messages[i:i + self.burst]
+            await self.acquire(len(chunk))
+            await send_many(chunk)
+
+
+class AnnouncementScheduler:
+    """One task announcing many identities, spread out over the interval
+    
+    Next-due times live in a min-heap. A new key is first announced within
+    `initial_delay` seconds. Its second announcement falls at a uniformly
+    random point of the following interval, which spreads the keys' phases
+    evenly; after that it repeats every `interval` seconds scaled by a
+    random factor within +/- jitter, so announcements never line up. Due
+    keys are turned into messages by `build` and sent through `limiter`.
+    """
+    
+    def __init__(self, send_many: Callable, build: Callable[[str], Optional[bytes]],
+                 interval: float = 600.0, jitter: float = 0.1, initial_delay: float = 1.0,
+                 limiter: Optional[RateLimiter] = None):
+        self.send_many = send_many
+        self.build = build
+        self.interval = interval
+        self.jitter = jitter
+        self.initial_delay = initial_delay
+        self.limiter = limiter or RateLimiter()
+        self.announced = 0
+        self._heap: List[Tuple[float, int, str]] = []  # (due, generation, key)
+        self._generations: Dict[str, int] = {}
+        self._starting: Set[str] = set()  # keys yet to make their first announcement
+        self._counter = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+    
+    def add(self, key: str):
+        """Start announcing key"""
+        self._counter += 1
+        self._generations[key] = self._counter
+        self._starting.add(key)
+        self._push(time.monotonic() + random.uniform(0, self.initial_delay), key)
+    
+    def add_many(self, keys: Iterable[str]):
+        for key in keys:
+            self.add(key)
+    
+    def discard(self, key: str):
+        """Stop announcing key; its heap entries are dropped when they come up"""
+        self._generations.pop(key, None)
+        self._starting.discard(key)
+    
+    def __len__(self):
+        return len(self._generations)
+    
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def _push(self, due: float, key: str):
+        heapq.heappush(self._heap, (due, self._generations[key], key))
+        if self._heap[0][2] == key:
+            # New earliest entry: the loop may be sleeping past it
+            self._wakeup.set()
+    
+    def _next_due(self) -> float:
+        return time.monotonic() + self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        heap = self._heap
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            if not heap or heap[0][0] > now:
+                delay = heap[0][0] - now if heap else None
+                timer = loop.call_later(delay, self._wakeup.set) if delay is not None else None
+                try:
+                    await self._wakeup.wait()
+                finally:
+                    if timer:
+                        timer.cancel()
+                continue
+            
+            batch = []
+            while heap and heap[0][0] <= now and len(batch) < self.limiter.burst:
+                _, generation, key = heapq.heappop(heap)
+                if self._generations.get(key) != generation:
+                    continue  # removed or re-added since
+                message = self.build(key)
+                if message is not None:
+                    batch.append(message)
+                if key in self._starting:
+                    # Start the key's cycle at a random phase of the interval
+                    self._starting.discard(key)
+                    due = now + random.uniform(0, self.interval)
+                else:
+                    due = self._next_due()
+                heapq.heappush(heap, (due, generation, key))
+            if batch:
+                try:
+                    await self.limiter.send(self.send_many, batch)
+                    self.announced += len(batch)
+                except OSError as e:
+                    log.warning("announce", "Sending announcements failed: %s", e)
@@ -1,9 +1,28 @@
 import asyncio
 import socket
 import struct
-import platform
-from typing import Callable, Tuple
+import sys
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Tuple, Union
 
+from .log import get_logger
+
+log = get_logger(__name__)
+
+Message = Union[str, bytes]
+
+_IP_MULTICAST_ALL = getattr(socket, "IP_MULTICAST_ALL", 49)  # Linux; not exposed by every Python
+
+
+def shard_of(addr: Tuple[str, int], count: int) -> int:
+    """Stable shard index for a source address, identical across processes
+    
+    Only the host counts, so a device sending from several (or ephemeral)
+    ports always lands on the same worker and its messages stay in order.
+    """
+    return zlib.crc32(addr[0].encode()) % count
 
 
 class AsyncMulticastProtocol(asyncio.DatagramProtocol):
@@ -21,64 +40,279 @@ class AsyncMulticastProtocol(asyncio.DatagramProtocol):
         self.on_datagram(data, addr)
     
     def error_received(self, exc):
-        print(f"Protocol error: {exc}")
+        log.warning("protocol", "Protocol error: %s", exc)
     
     def connection_lost(self, exc):
         if exc:
-            print(f"Connection lost: {exc}")
+            log.warning("connection", "Connection lost: %s", exc)
 
 
-class MulticastTransport:
-    """Handles multicast socket operations"""
+class BatchResult(NamedTuple):
+    """Outcome of BaseTransport.send_many"""
+    sent: int
+    eagain: int
+
+
+class TransportStats:
+    """Send counters and timings for a transport"""
+    
+    def __init__(self):
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.send_time = 0.0
+        self.max_send_time = 0.0
+        self.eagain = 0
+        self.first_send_at: Optional[float] = None
+        self.last_send_at: Optional[float] = None
+    
+    def record(self, size: int, started: float, finished: float):
+        """Record one datagram handed to the socket"""
+        elapsed = finished - started
+        self.packets_sent += 1
+        self.bytes_sent += size
+        self.send_time += elapsed
+        if elapsed > self.max_send_time:
+            self.max_send_time = elapsed
+        if self.first_send_at is None:
+            self.first_send_at = started
+        self.last_send_at = finished
+    
+    @property
+    def avg_send_latency(self) -> float:
+        """Mean time spent per send call, in seconds"""
+        return self.send_time / self.packets_sent if self.packets_sent else 0.0
+    
+    @property
+    def packets_per_second(self) -> float:
+        """Send throughput between the first and the last datagram"""
+        if self.first_send_at is None or self.last_send_at == self.first_send_at:
+            return 0.0
+        return self.packets_sent / (self.last_send_at - self.first_send_at)
+    
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'packets_sent': self.packets_sent,
+            'bytes_sent': self.bytes_sent,
+            'eagain': self.eagain,
+            'avg_send_latency': self.avg_send_latency,
+            'max_send_latency': self.max_send_time,
+            'packets_per_second': self.packets_per_second,
+        }
+
+
+class BaseTransport(ABC):
+    """Interface SSDPService uses to move datagrams
+    
+    Backends implement listening, opening the sender and handing a single
+    datagram to the network; send and send_many are shared.
+    """
     
     def __init__(self, multicast_group: str, multicast_port: int):
         self.multicast_group = multicast_group
         self.multicast_port = multicast_port
-        self.listener_transport = None
+        self.stats = TransportStats()
     
-    async def send(self, message: str):
-        """Send a multicast message"""
-        loop = asyncio.get_event_loop()
+    @abstractmethod
+    async def start_listener(self, on_datagram: Callable[[bytes, Tuple[str, int]], None]):
+        """Start delivering received datagrams to on_datagram"""
+    
+    @abstractmethod
+    def stop_listener(self):
+        """Stop delivering received datagrams"""
+    
+    @abstractmethod
+    async def start_sender(self):
+        """Prepare the sending side; called before the first send"""
+    
+    @abstractmethod
+    def _ready(self) -> bool:
+        """Whether the sending side is open"""
+    
+    @abstractmethod
+    def _sendto(self, data: bytes, addr: Tuple[str, int]) -> bool:
+        """Hand one datagram to the network; True if it had to be queued (EAGAIN)"""
+    
+    def close(self):
+        """Release everything the transport holds"""
+        self.stop_listener()
+    
+    async def send(self, message: Message, addr: Optional[Tuple[str, int]] = None):
+        """Send a message to the multicast group, or unicast to addr"""
+        if not self._ready():
+            await self.start_sender()
         
-        def _send():
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-            ttl = struct.pack("b", 1)
-            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
-            sock.sendto(message.encode("utf-8"), (self.multicast_group, self.multicast_port))
-            sock.close()
+        self._send_one(message, addr or (self.multicast_group, self.multicast_port))
+    
+    async def send_many(self, messages: Iterable[Union[Message, Tuple[Message, Tuple[str, int]]]],
+                        pacing: float = 0.0, burst: int = 1) -> BatchResult:
+        """Send a batch of messages in one pass
+        
+        Items are either a payload (sent to the multicast group) or a
+        (payload, addr) pair. With pacing > 0 the batch pauses for that
+        many seconds after every `burst` packets.
+        """
+        if not self._ready():
+            await self.start_sender()
         
-        await loop.run_in_executor(None, _send)
+        group = (self.multicast_group, self.multicast_port)
+        sent = 0
+        eagain = 0
+        for item in messages:
+            if isinstance(item, tuple):
+                message, addr = item
+            else:
+                message, addr = item, group
+            
+            if self._send_one(message, addr):
+                eagain += 1
+            sent += 1
+            
+            if pacing and sent % burst == 0:
+                await asyncio.sleep(pacing)
+        
+        self.stats.eagain += eagain
+        return BatchResult(sent, eagain)
+    
+    def _send_one(self, message: Message, addr: Tuple[str, int]) -> bool:
+        data = message.encode("utf-8") if isinstance(message, str) else message
+        started = time.perf_counter()
+        queued = self._sendto(data, addr)
+        self.stats.record(len(data), started, time.perf_counter())
+        return queued
+
+
+class MulticastTransport(BaseTransport):
+    """Handles multicast socket operations"""
+    
+    def __init__(self, multicast_group: str, multicast_port: int,
+                 ttl: int = 1, loopback: bool = True, interface: Optional[str] = None,
+                 reuse_port: bool = False, shard: Optional[Tuple[int, int]] = None):
+        super().__init__(multicast_group, multicast_port)
+        self.ttl = ttl
+        self.loopback = loopback
+        self.interface = interface
+        self.reuse_port = reuse_port
+        self.shard = shard  # (index, count): only handle multicast from sources in this shard
+        self.listener_transport = None
+        self.unicast_transport = None  # shard 0 only: unicast to the SSDP port
+        self.sender_transport = None
+        self._on_datagram: Optional[Callable[[bytes, Tuple[str, int]], None]] = None
+        self._sender_lock = asyncio.Lock()
+    
+    async def start_sender(self):
+        """Open the long-lived socket used for all outgoing datagrams"""
+        async with self._sender_lock:
+            if self.sender_transport:
+                return
+            
+            loop = asyncio.get_running_loop()
+            
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, struct.pack("b", self.ttl))
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, struct.pack("b", int(self.loopback)))
+            if self.interface:
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(self.interface))
+            sock.bind((self.interface or "", 0))
+            sock.setblocking(False)
+            
+            # Unicast replies to our searches arrive on this socket's port
+            self.sender_transport, _ = await loop.create_datagram_endpoint(
+                lambda: AsyncMulticastProtocol(self._on_unicast),
+                sock=sock
+            )
+    
+    def stop_sender(self):
+        """Close the outgoing socket"""
+        if self.sender_transport:
+            self.sender_transport.close()
+            self.sender_transport = None
+    
+    def _ready(self) -> bool:
+        return self.sender_transport is not None
+    
+    def _sendto(self, data: bytes, addr: Tuple[str, int]) -> bool:
+        buffered = self.sender_transport.get_write_buffer_size()
+        self.sender_transport.sendto(data, addr)
+        # The event loop queues the datagram instead of raising when the socket would block
+        return self.sender_transport.get_write_buffer_size() > buffered
+    
+    def _on_unicast(self, data: bytes, addr: Tuple[str, int]):
+        if self._on_datagram:
+            self._on_datagram(data, addr)
     
     async def start_listener(self, on_datagram: Callable[[bytes, Tuple[str, int]], None]):
         """Start listening for multicast messages"""
         if self.listener_transport:
             return
         
+        self._on_datagram = on_datagram
         loop = asyncio.get_event_loop()
         
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # A sharded socket is bound to the group, so it only gets multicast:
+        # the kernel has already balanced unicast across the reuseport group
+        sock = self._listener_socket(self.multicast_group if self.shard else "")
         
-        if platform.system() in ['Darwin', 'FreeBSD', 'OpenBSD', 'NetBSD']:
-            try:
-                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
-            except AttributeError:
-                pass
-        
-        sock.bind(("", self.multicast_port))
-        
-        mreq = struct.pack("4sl", 
-                          socket.inet_aton(self.multicast_group),
-                          socket.INADDR_ANY)
+        if self.interface:
+            mreq = struct.pack("4s4s",
+                               socket.inet_aton(self.multicast_group),
+                               socket.inet_aton(self.interface))
+        else:
+            mreq = struct.pack("4sl", 
+                              socket.inet_aton(self.multicast_group),
+                              socket.INADDR_ANY)
         sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
         
+        on_multicast = self._shard_filter(on_datagram, *self.shard) if self.shard else on_datagram
         self.listener_transport, _ = await loop.create_datagram_endpoint(
-            lambda: AsyncMulticastProtocol(on_datagram),
+            lambda: AsyncMulticastProtocol(on_multicast),
             sock=sock
         )
+        
+        if self.shard and self.shard[0] == 0:
+            # One unsharded socket takes all unicast to the port; it joins no
+            # group and opts out of the rest, so it sees no multicast
+            sock = self._listener_socket("")
+            sock.setsockopt(socket.IPPROTO_IP, _IP_MULTICAST_ALL, 0)
+            self.unicast_transport, _ = await loop.create_datagram_endpoint(
+                lambda: AsyncMulticastProtocol(on_datagram),
+                sock=sock
+            )
+    
+    def _listener_socket(self, address: str) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        
+        if self.reuse_port or sys.platform.startswith(('darwin', 'freebsd', 'openbsd', 'netbsd')):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            except (AttributeError, OSError):
+                if self.reuse_port:
+                    sock.close()
+                    raise
+        
+        sock.bind((address, self.multicast_port))
+        return sock
+    
+    @staticmethod
+    def _shard_filter(on_datagram: Callable[[bytes, Tuple[str, int]], None],
+                      index: int, count: int) -> Callable[[bytes, Tuple[str, int]], None]:
+        # Multicast reaches every socket in a SO_REUSEPORT group, so shards split by source
+        def _filtered(data: bytes, addr: Tuple[str, int]):
+            if shard_of(addr, count) == index:
+                on_datagram(data, addr)
+        return _filtered
     
     def stop_listener(self):
         """Stop listening for multicast messages"""
         if self.listener_transport:
             self.listener_transport.close()
-            self.listener_transport = None
\ No newline at end of file
+            self.listener_transport = None
+        if self.unicast_transport:
+            self.unicast_transport.close()
+            self.unicast_transport = None
+        self._on_datagram = None
+    
+    def close(self):
+        """Close both the listener and the sender sockets"""
+        self.stop_listener()
+        self.stop_sender()
\ No newline at end of file
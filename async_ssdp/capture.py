@@ -0,0 +1,238 @@
+import asyncio
+import os
+import struct
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+
+from .duplicate_filter import DuplicateFilter
+from .log import get_logger
+
+log = get_logger(__name__)
+
+MAGIC = b"SSDPCAP\x01"
+# timestamp, payload length, source port, source host length; then host, then payload
+_RECORD = struct.Struct("<dIHB")
+
+Record = Tuple[float, bytes, Tuple[str, int]]  # timestamp, data, addr
+
+class CaptureWriter:
+    """Appends raw datagrams to a rotating, size-bounded binary log
+    
+    write() only appends a record to an in-memory buffer; a background task
+    hands the buffer to the file in one write every `flush_interval`
+    seconds, or as soon as it holds `buffer_size` bytes. When the file
+    would grow past `max_bytes` it is rotated like logging's
+    RotatingFileHandler (path -> path.1 -> ... -> path.<backups>). If the
+    disk falls behind by more than `max_buffer` bytes, new records are
+    dropped and counted rather than held in memory.
+    """
+    
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, backups: int = 4,
+                 buffer_size: int = 256 * 1024, flush_interval: float = 0.5,
+                 max_buffer: int = 16 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.records = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.rotations = 0
+        self._buffer = bytearray()
+        self._file = None
+        self._size = 0
+        self._lock = asyncio.Lock()
+        self._full = asyncio.Event()
+        self._flush_task = None
+    
+    async def open(self):
+        """Open the log for appending and start the background flushes"""
+        if self._file is not None:
+            return
+        await self._open_file()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    def write(self, data: bytes, addr: Tuple[str, int], timestamp: Optional[float] = None):
+        """Buffer one datagram"""
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            return
+        host = addr[0].encode("ascii")
+        self._buffer += _RECORD.pack(time.time() if timestamp is None else timestamp, len(data), addr[1], len(host))
+        self._buffer += host
+        self._buffer += data
+        self.records += 1
+        if len(self._buffer) >= self.buffer_size:
+            self._full.set()
+    
+    async def flush(self):
+        """Write out everything buffered so far"""
+        async with self._lock:
+            if not self._buffer or self._file is None:
+                return
+            chunk, self._buffer = self._buffer, bytearray()
+            if self._size + len(chunk) > self.max_bytes and self._size > len(MAGIC):
+                await self._rotate()
+            await self._file.write(chunk)
+            await self._file.flush()
+            self._size += len(chunk)
+            self.bytes_written += len(chunk)
+    
+    async def close(self):
+        """Flush what is left and close the log"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        if self._file is not None:
+            await self._file.close()
+            self._file = None
+    
+    def as_dict(self) -> dict:
+        return {
+            'records': self.records,
+            'dropped': self.dropped,
+            'buffered': len(self._buffer),
+            'bytes_written': self.bytes_written,
+            'rotations': self.rotations,
+        }
+    
+    async def _open_file(self):
+        import aiofiles
+        self._file = await aiofiles.open(self.path, 'ab')
+        self._size = await self._file.tell()
+        if self._size == 0:
+            await self._file.write(MAGIC)
+            self._size = len(MAGIC)
+    
+    async def _rotate(self):
+        import aiofiles.os
+        await self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                await aiofiles.os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            await aiofiles.os.replace(self.path, f"{self.path}.1")
+        else:
+            await aiofiles.os.remove(self.path)
+        await self._open_file()
+        self.rotations += 1
+    
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # A timer rather than wait_for(): cancelling wait_for can hang on 3.11
+            timer = loop.call_later(self.flush_interval, self._full.set)
+            try:
+                await self._full.wait()
+            finally:
+                timer.cancel()
+            self._full.clear()
+            try:
+                await self.flush()
+            except OSError as e:
+                log.error("capture", "Writing capture %s failed: %s", self.path, e)
+
+
+def capture_files(path: str) -> List[str]:
+    """A capture's files, oldest rotation first"""
+    rotated = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        rotated.append(f"{path}.{index}")
+        index += 1
+    files = rotated[::-1]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+async def read_capture(path: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[Record]:
+    """Yield (timestamp, data, addr) for every record in one capture file
+    
+    A record cut short at the end of the file (e.g. by a crash while
+    writing) ends the iteration.
+    """
+    import aiofiles
+    async with aiofiles.open(path, 'rb') as file:
+        if await file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an SSDP capture")
+        
+        pending = b""
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                return
+            data = pending + chunk if pending else chunk
+            offset = 0
+            end = len(data)
+            while end - offset >= _RECORD.size:
+                timestamp, length, port, host_length = _RECORD.unpack_from(data, offset)
+                start = offset + _RECORD.size
+                stop = start + host_length + length
+                if stop > end:
+                    break
+                host = data[start:start + host_length].decode("ascii")
+                yield timestamp, data[start + host_length:stop], (host, port)
+                offset = stop
+            pending = data[offset:]
+
+
+class Replayer:
+    """Feeds captured traffic back through a service's parser and EventBus
+    
+    speed=1.0 keeps the original spacing between datagrams, 2.0 replays
+    twice as fast, and None (or 0) replays as fast as the subscribers
+    keep up. Datagrams go straight to SSDPService.dispatch, not through
+    the ingest queue, so nothing is shed and each publish is awaited.
+    Duplicates are dropped as the service would have dropped them, judged
+    on the captured timestamps so the replay speed makes no difference.
+    """
+    
+    # Don't sleep for gaps shorter than this; the loop can't honour them anyway
+    MIN_SLEEP = 0.001
+    # Yield to the loop this often at max speed
+    YIELD_EVERY = 256
+    
+    def __init__(self, service, speed: Optional[float] = 1.0):
+        self.service = service
+        self.speed = speed
+        self.replayed = 0
+        self.duplicates = 0
+        self.max_lag = 0.0
+    
+    async def run(self, path: str, include_rotated: bool = True) -> int:
+        """Replay a capture, by default including its rotated files; returns the count dispatched"""
+        files = capture_files(path) if include_rotated else [path]
+        live = self.service.duplicates
+        duplicates = DuplicateFilter(live.window, live.maxsize) if live is not None else None
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first = None
+        count = 0
+        for name in files:
+            async for timestamp, data, addr in read_capture(name):
+                if first is None:
+                    first = timestamp
+                if duplicates is not None and duplicates.is_duplicate(data, addr, timestamp):
+                    self.duplicates += 1
+                    continue
+                if self.speed:
+                    delay = started + (timestamp - first) / self.speed - loop.time()
+                    if delay > self.MIN_SLEEP:
+                        await asyncio.sleep(delay)
+                    elif -delay > self.max_lag:
+                        self.max_lag = -delay
+                elif count % self.YIELD_EVERY == 0:
+                    await asyncio.sleep(0)
+                await self.service.dispatch(data, addr)
+                count += 1
+        self.replayed += count
+        return count
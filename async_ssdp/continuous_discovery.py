@@ -0,0 +1,185 @@
+import asyncio
+import math
+import time
+from typing import Dict, List, Set
+
+from .log import get_logger
+
+log = get_logger(__name__)
+
+class ContinuousDiscovery:
+    """Keeps an SSDPClient's registry complete with as few searches as possible
+    
+    While converging, `target` is searched in rounds spaced by a backoff
+    that doubles each round, until `settle_rounds` rounds in a row turn up
+    no new responder. Each round's MX is sized from how the responses to
+    the one before were spread out: the MX used is scaled by how far their
+    arrival rate over that spread was above or below `response_rate`
+    responses per second, within min_mx..max_mx. Only M-SEARCH responses
+    count towards either; announcements go to the registry but don't
+    drive the search. Once converged,
+    only devices within `refresh_within` seconds of cache expiry are
+    searched for, by uuid and unicast, every `refresh_interval` seconds;
+    new devices are left to announce themselves, and a full convergence
+    runs again every `full_interval` seconds.
+    """
+    
+    MIN_SPREAD = 0.05  # seconds; answers closer together than this count as one burst
+    
+    def __init__(self, client, target: str = "ssdp:all", min_mx: int = 1, max_mx: int = 5,
+                 response_rate: float = 100.0, backoff: float = 1.0, max_backoff: float = 30.0,
+                 settle_rounds: int = 2, refresh_interval: float = 30.0, refresh_within: float = 60.0,
+                 full_interval: float = 900.0):
+        self.client = client
+        self.target = target
+        self.min_mx = min_mx
+        self.max_mx = max_mx
+        self.response_rate = response_rate
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.settle_rounds = settle_rounds
+        self.refresh_interval = refresh_interval
+        self.refresh_within = refresh_within
+        self.full_interval = full_interval
+        self.mx = max_mx
+        self.rounds = 0
+        self.searches = 0
+        self.targeted = 0
+        self.converged = False
+        self._heard: Set[str] = set()
+        self._searched: Dict[str, float] = {}  # uuid -> when its answer is due by
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = None
+    
+    @property
+    def discovered(self) -> int:
+        """Distinct devices heard from since start"""
+        return len(self._heard)
+    
+    @property
+    def packets_per_device(self) -> float:
+        return (self.searches + self.targeted) / max(len(self._heard), 1)
+    
+    async def start(self):
+        if self._task is None:
+            await self.client._ensure_subscribed()
+            self.client._response_listeners.add(self._queue)
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.client._response_listeners.discard(self._queue)
+    
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'rounds': self.rounds,
+            'searches': self.searches,
+            'targeted': self.targeted,
+            'discovered': len(self._heard),
+            'packets_per_device': self.packets_per_device,
+            'mx': self.mx,
+            'converged': int(self.converged),
+        }
+    
+    async def converge(self) -> int:
+        """Search in rounds until the responders stop growing; returns the new devices found"""
+        self.converged = False
+        found = 0
+        quiet = 0
+        delay = self.backoff
+        while quiet < self.settle_rounds:
+            new = await self._round()
+            found += new
+            quiet = 0 if new else quiet + 1
+            if quiet < self.settle_rounds:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+        self.converged = True
+        log.info("converged", "Discovery converged after %d rounds: %d devices, %.2f packets per device",
+                 self.rounds, len(self._heard), self.packets_per_device)
+        return found
+    
+    async def refresh(self) -> int:
+        """Search by uuid for the devices about to expire; returns the packets sent"""
+        self._drain()
+        now = time.monotonic()
+        # Don't search again for a device whose answer may still be on its way
+        self._searched = {u: due for u, due in self._searched.items() if due > now}
+        devices = [d for d in self.client.registry.get_expiring(self.refresh_within)
+                   if d['uuid'] not in self._searched]
+        if not devices:
+            return 0
+        due = now + self.min_mx + 1
+        for device in devices:
+            self._searched[device['uuid']] = due
+        sent = await self.client._search_devices(devices, self.min_mx)
+        self.targeted += sent
+        return sent
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.converge()
+            except Exception as e:
+                log.warning("search", "Discovery search failed: %s", e)
+                await asyncio.sleep(self.max_backoff)
+                continue
+            next_full = time.monotonic() + self.full_interval
+            while time.monotonic() < next_full:
+                await asyncio.sleep(min(self.refresh_interval, max(0.0, next_full - time.monotonic())))
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    log.warning("refresh", "Targeted search failed: %s", e)
+    
+    async def _round(self) -> int:
+        """One search; returns how many responders had not been heard from before"""
+        new = self._drain()
+        mx = self.mx
+        sent_at = time.monotonic()
+        await self.client.service.broadcast_msearch(self.target, mx)
+        self.searches += 1
+        self.rounds += 1
+        
+        deadline = sent_at + mx + 1
+        arrivals = []
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                device = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            arrivals.append(time.monotonic())
+            if device['uuid'] not in self._heard:
+                self._heard.add(device['uuid'])
+                new += 1
+        
+        self.mx = self._next_mx(mx, arrivals)
+        return new
+    
+    def _next_mx(self, mx: int, arrivals: List[float]) -> int:
+        """MX that would bring the observed arrival rate down (or up) to response_rate"""
+        if len(arrivals) < 2:
+            return self.min_mx
+        spread = max(arrivals[-1] - arrivals[0], self.MIN_SPREAD)
+        observed_rate = len(arrivals) / spread
+        needed = math.ceil(mx * observed_rate / self.response_rate)
+        return min(self.max_mx, max(self.min_mx, needed))
+    
+    def _drain(self) -> int:
+        """Take in responses that arrived between rounds (late or targeted answers)"""
+        new = 0
+        while not self._queue.empty():
+            uuid = self._queue.get_nowait()['uuid']
+            if uuid not in self._heard:
+                self._heard.add(uuid)
+                new += 1
+        return new
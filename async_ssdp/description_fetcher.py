@@ -0,0 +1,300 @@
+import asyncio
+import json
+import time
+import xml.etree.ElementTree as ElementTree
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .log import get_logger
+
+log = get_logger(__name__)
+
+Response = Tuple[int, Dict[str, str], bytes]  # status, headers (folded names), body
+_Key = Tuple[str, int, bool]  # host, port, tls
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections, shared by every request to a host
+    
+    At most `per_host` requests run against one host at a time, each on an
+    idle connection when there is one. Connections idle for longer than
+    `idle_timeout` are closed rather than reused. Only GET is supported,
+    which is all device descriptions need.
+    """
+    
+    def __init__(self, per_host: int = 2, timeout: float = 5.0, idle_timeout: float = 30.0,
+                 max_size: int = 256 * 1024):
+        self.per_host = per_host
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_size = max_size
+        self.opened = 0
+        self.reused = 0
+        self._idle: Dict[_Key, List[Tuple[float, asyncio.StreamReader, asyncio.StreamWriter]]] = {}
+        self._limits: Dict[_Key, asyncio.Semaphore] = {}
+    
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> Response:
+        """GET url; raises OSError, ValueError or TimeoutError on failure"""
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Unsupported URL {url!r}")
+        tls = parts.scheme == 'https'
+        key = (parts.hostname, parts.port or (443 if tls else 80), tls)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        lines = [f"GET {path} HTTP/1.1", f"Host: {parts.netloc}", "Connection: keep-alive"]
+        lines.extend(f"{k}: {v}" for k, v in (headers or {}).items())
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        
+        limit = self._limits.get(key)
+        if limit is None:
+            limit = self._limits[key] = asyncio.Semaphore(self.per_host)
+        async with limit:
+            async with asyncio.timeout(self.timeout):
+                connection = self._checkout(key)
+                if connection is not None:
+                    try:
+                        return await self._exchange(key, connection, request)
+                    except (ConnectionError, asyncio.IncompleteReadError):
+                        pass  # closed by the server while idle; retry on a new connection
+                reader, writer = await asyncio.open_connection(key[0], key[1], ssl=tls or None)
+                self.opened += 1
+                return await self._exchange(key, (reader, writer), request)
+    
+    async def close(self):
+        """Close every idle connection"""
+        for connections in self._idle.values():
+            for _, _, writer in connections:
+                writer.close()
+        self._idle.clear()
+    
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            'opened': self.opened,
+            'reused': self.reused,
+            'idle': sum(len(c) for c in self._idle.values()),
+        }
+    
+    def _checkout(self, key: _Key) -> Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]:
+        connections = self._idle.get(key)
+        now = time.monotonic()
+        while connections:
+            idle_since, reader, writer = connections.pop()
+            if now - idle_since < self.idle_timeout and not reader.at_eof():
+                self.reused += 1
+                return reader, writer
+            writer.close()
+        return None
+    
+    async def _exchange(self, key: _Key, connection, request: bytes) -> Response:
+        reader, writer = connection
+        try:
+            writer.write(request)
+            await writer.drain()
+            status, headers, body, keep_alive = await self._read_response(reader)
+        except BaseException:
+            writer.close()
+            raise
+        if keep_alive:
+            self._idle.setdefault(key, []).append((time.monotonic(), reader, writer))
+        else:
+            writer.close()
+        return status, headers, body
+    
+    async def _read_response(self, reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], bytes, bool]:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed before the response")
+        version, _, rest = line.partition(b' ')
+        try:
+            status = int(rest[:3])
+        except ValueError:
+            raise ValueError(f"Malformed status line {line[:64]!r}")
+        
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            name, _, value = line.partition(b':')
+            headers[name.strip().decode('latin-1').lower()] = value.strip().decode('latin-1')
+        
+        keep_alive = version == b'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if status in (204, 304) or status < 200:
+            body = b''
+        elif 'chunked' in headers.get('transfer-encoding', '').lower():
+            body = await self._read_chunked(reader)
+        elif 'content-length' in headers:
+            length = int(headers['content-length'])
+            if length > self.max_size:
+                raise ValueError(f"Response of {length} bytes is too large")
+            body = await reader.readexactly(length)
+        else:
+            # Delimited by the server closing the connection
+            body = await reader.read(self.max_size + 1)
+            if len(body) > self.max_size:
+                raise ValueError("Response is too large")
+            keep_alive = False
+        return status, headers, body, keep_alive
+    
+    async def _read_chunked(self, reader: asyncio.StreamReader) -> bytes:
+        body = bytearray()
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                # Skip trailers
+                while (await reader.readline()).strip():
+                    pass
+                return bytes(body)
+            if len(body) + size > self.max_size:
+                raise ValueError("Response is too large")
+            body += await reader.readexactly(size)
+            await reader.readexactly(2)
+
+
+class _CacheEntry:
+    __slots__ = ('description', 'expires_at', 'boot_id', 'etag', 'last_modified')
+    
+    def __init__(self, description: dict, expires_at: float, boot_id: Optional[int],
+                 etag: Optional[str], last_modified: Optional[str]):
+        self.description = description
+        self.expires_at = expires_at
+        self.boot_id = boot_id
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class DescriptionFetcher:
+    """Fetches device descriptions from LOCATION URLs, pooled and cached
+    
+    Descriptions are cached by LOCATION for the device's SSDP max-age. A
+    cached description is served until then, unless the device announces
+    a different BOOTID.UPNP.ORG, i.e. it rebooted. Once expired, it is
+    revalidated with a conditional GET when the server sent an ETag or
+    Last-Modified. Concurrent fetches of one LOCATION share one request.
+    XML descriptions become nested dicts (namespaces dropped, repeated
+    elements as lists); JSON descriptions are returned as decoded.
+    """
+    
+    def __init__(self, per_host: int = 2, timeout: float = 5.0, cache_size: int = 4096,
+                 default_max_age: int = 1800, idle_timeout: float = 30.0,
+                 max_size: int = 256 * 1024):
+        self.pool = ConnectionPool(per_host, timeout, idle_timeout, max_size)
+        self.cache_size = cache_size
+        self.default_max_age = default_max_age
+        self.fetched = 0
+        self.revalidated = 0
+        self.hits = 0
+        self.failures = 0
+        self._cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+    
+    def cached(self, location: str, boot_id: Optional[int] = None) -> Optional[dict]:
+        """The cached description for location, if it is still fresh"""
+        entry = self._cache.get(location)
+        if entry is None or entry.expires_at <= time.monotonic():
+            return None
+        if boot_id is not None and entry.boot_id is not None and boot_id != entry.boot_id:
+            return None
+        self._cache.move_to_end(location)
+        self.hits += 1
+        return entry.description
+    
+    async def fetch(self, location: str, max_age: Optional[int] = None,
+                    boot_id: Optional[int] = None) -> Optional[dict]:
+        """The description at location, from the cache when fresh; None if it can't be had"""
+        description = self.cached(location, boot_id)
+        if description is not None:
+            return description
+        future = self._inflight.get(location)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(location, max_age or self.default_max_age, boot_id))
+            self._inflight[location] = future
+            future.add_done_callback(lambda _: self._inflight.pop(location, None))
+        # One waiter giving up must not cancel the request for the others
+        return await asyncio.shield(future)
+    
+    def invalidate(self, location: str):
+        self._cache.pop(location, None)
+    
+    async def close(self):
+        for future in list(self._inflight.values()):
+            future.cancel()
+        await self.pool.close()
+    
+    def __len__(self):
+        return len(self._cache)
+    
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            'fetched': self.fetched,
+            'revalidated': self.revalidated,
+            'hits': self.hits,
+            'failures': self.failures,
+            'cached': len(self._cache),
+            **self.pool.as_dict(),
+        }
+    
+    async def _fetch(self, location: str, max_age: int, boot_id: Optional[int]) -> Optional[dict]:
+        entry = self._cache.get(location)
+        headers = {}
+        # A reboot may change the description without changing its validators
+        if entry is not None and (boot_id is None or entry.boot_id in (None, boot_id)):
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        
+        try:
+            status, response_headers, body = await self.pool.get(location, headers)
+            if status == 304 and headers:
+                entry.expires_at = time.monotonic() + max_age
+                entry.boot_id = boot_id
+                self._cache.move_to_end(location)
+                self.revalidated += 1
+                return entry.description
+            if status != 200:
+                raise ValueError(f"HTTP status {status}")
+            description = parse_description(body, response_headers.get('content-type', ''))
+        except (OSError, ValueError, TimeoutError, asyncio.IncompleteReadError, ElementTree.ParseError) as e:
+            self.failures += 1
+            log.warning("describe", "Fetching description %s failed: %s", location, e)
+            return None
+        
+        self._cache[location] = _CacheEntry(description, time.monotonic() + max_age, boot_id,
+                                            response_headers.get('etag'), response_headers.get('last-modified'))
+        self._cache.move_to_end(location)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        self.fetched += 1
+        return description
+
+
+def parse_description(body: bytes, content_type: str = '') -> dict:
+    """Decode a JSON or UPnP XML device description"""
+    if 'json' in content_type or body.lstrip()[:1] in (b'{', b'['):
+        return json.loads(body)
+    root = ElementTree.fromstring(body)
+    description = _element_to_dict(root)
+    return description if isinstance(description, dict) else {_local_name(root.tag): description}
+
+
+def _element_to_dict(element: ElementTree.Element):
+    if len(element) == 0:
+        return (element.text or '').strip()
+    result = {}
+    for child in element:
+        name = _local_name(child.tag)
+        value = _element_to_dict(child)
+        if name not in result:
+            result[name] = value
+        elif isinstance(result[name], list):
+            result[name].append(value)
+        else:
+            result[name] = [result[name], value]
+    return result
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
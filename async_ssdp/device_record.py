@@ -0,0 +1,69 @@
+from collections.abc import MutableMapping
+from typing import Optional, Tuple
+
+_DERIVED = object()
+
+FIELDS = ('uuid', 'usn', 'location', 'role', 'expires_at', 'addr', 'description')
+_FIELD_SET = frozenset(FIELDS)
+
+class DeviceRecord(MutableMapping):
+    """A registry entry in a fixed set of slots, read and written like the dict it replaces
+    
+    Used by DeviceRegistry(compact=True), which hands out dict copies of
+    its records (as does copy()). The usual USN, uuid:<uuid>::<role>,
+    is not stored but rebuilt when read. Only the fields of a device dict
+    exist; setting any other key raises KeyError.
+    """
+    
+    __slots__ = ('uuid', '_usn', 'location', 'role', 'expires_at', 'addr', 'description')
+    
+    def __init__(self, uuid: str, usn: Optional[str], location: Optional[str], role: Optional[str],
+                 expires_at: float, addr: Optional[Tuple[str, int]], description: Optional[dict] = None):
+        self.uuid = uuid
+        self.role = role
+        self.usn = usn
+        self.location = location
+        self.expires_at = expires_at
+        self.addr = addr
+        self.description = description
+    
+    @property
+    def usn(self) -> Optional[str]:
+        usn = self._usn
+        return f"uuid:{self.uuid}::{self.role}" if usn is _DERIVED else usn
+    
+    @usn.setter
+    def usn(self, usn: Optional[str]):
+        derived = usn is not None and self.role is not None and usn == f"uuid:{self.uuid}::{self.role}"
+        self._usn = _DERIVED if derived else usn
+    
+    def __getitem__(self, key: str):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __setitem__(self, key: str, value):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        if key == 'role' and self._usn is _DERIVED:
+            # Keep the USN, which was derived from the old role
+            usn = self.usn
+            self.role = value
+            self.usn = usn
+        else:
+            setattr(self, key, value)
+    
+    def __delitem__(self, key: str):
+        raise TypeError("DeviceRecord fields can't be deleted")
+    
+    def __iter__(self):
+        return iter(FIELDS)
+    
+    def __len__(self):
+        return len(FIELDS)
+    
+    def copy(self) -> dict:
+        return dict(self)
+    
+    def __repr__(self):
+        return f"DeviceRecord({dict(self)!r})"
@@ -1,30 +1,433 @@
+import asyncio
+import heapq
+import json
+import sys
 import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
+from .device_record import DeviceRecord
+from .log import get_logger
 from .parsed_message import ParsedMessage
+from .registry_changes import ADDED, BYEBYE, EXPIRED, UPDATED, Change, ChangeFeed
+
+log = get_logger(__name__)
+
+SNAPSHOT_VERSION = 1
 
 class DeviceRegistry:
-    """Track discovered devices with automatic expiry"""
+    """Track discovered devices with automatic expiry
     
-    def __init__(self):
-        self.devices = {}  # uuid -> DeviceInfo
-        
-    def register(self, message: ParsedMessage, addr):
+    Expiry times live in a min-heap, so a sweep only touches entries that
+    actually expired. Role, USN and source-address indexes keep lookups
+    off the full device table. All times come from time.monotonic().
+    With enabled `metrics`, the size is recorded whenever it changes.
+    A description set with set_description() is kept across updates for
+    as long as the device's LOCATION stays the same.
+    
+    save() and load() persist the table across restarts: a snapshot stores
+    wall-clock expiry times, and loading keeps only unexpired entries.
+    
+    subscribe_changes() reports added, updated, expired and byebye devices
+    in coalesced batches (see ChangeFeed). A device counts as updated only
+    when its LOCATION or host changes; re-announcements under another NT
+    or answers from another port just move the expiry time.
+    
+    With compact=True, devices are stored as DeviceRecords instead of
+    dicts, and their role and host strings are interned, so the many
+    devices sharing a role or host share one copy. Everything the registry
+    hands out is still a plain dict, copied from the record, so writing
+    to it does not change the registry.
+    """
+    
+    def __init__(self, default_max_age: int = 1800, metrics=None, compact: bool = False):
+        self.devices: Dict[str, dict] = {}  # uuid -> DeviceInfo (a DeviceRecord when compact)
+        self.default_max_age = default_max_age
+        self._expiry: List[Tuple[float, str]] = []  # (expires_at, uuid), may hold stale entries
+        self._by_role: Dict[str, Set[str]] = {}
+        self._by_usn: Dict[str, str] = {}
+        self._by_host: Dict[str, Set[str]] = {}  # a lone uuid is stored bare when compact
+        self._sweep_task = None
+        self._snapshot_task = None
+        self._changes = 0
+        self._feeds: List[ChangeFeed] = []
+        self.compact = compact
+        self.metrics = metrics
+    
+    def register(self, message: ParsedMessage, addr) -> Optional[dict]:
         """Register/update a device from NOTIFY or M-SEARCH response"""
-        uuid = message.get_uuid()
-        cache = message.get_cache_control() or 1800
-        
-        self.devices[uuid] = {
-            'location': message.get_location(),
-            'role': message.get_role(),
-            'expires_at': time.time() + cache,
-            'addr': addr
-        }
-    
-    def remove_expired(self):
-        """Remove devices past their cache expiry"""
-        now = time.time()
-        self.devices = {k: v for k, v in self.devices.items() if v['expires_at'] > now}
+        return self.update(message.get_uuid(), message.get_usn(), message.get_location(),
+                           message.get_role(), message.get_cache_control(), addr)
+    
+    def update(self, uuid: str, usn: Optional[str], location: Optional[str], role: Optional[str],
+               max_age: Optional[int], addr) -> Optional[dict]:
+        """Register/update a device from already extracted fields"""
+        if not uuid:
+            return None
+        cache = max_age or self.default_max_age
+        
+        if self.compact:
+            device = self._record(uuid, usn, location, role, time.monotonic() + cache, addr)
+        else:
+            device = {
+                'uuid': uuid,
+                'usn': usn,
+                'location': location,
+                'role': role,
+                'expires_at': time.monotonic() + cache,
+                'addr': addr,
+                'description': None
+            }
+        
+        previous = self.devices.get(uuid)
+        if previous is not None:
+            self._unindex(uuid, previous)
+            if previous['location'] == location:
+                device['description'] = previous['description']
+        self.devices[uuid] = device
+        self._index(uuid, device)
+        if previous is None:
+            self._observe_size()
+        self._changes += 1
+        if self._feeds:
+            if previous is None:
+                self._emit(ADDED, device)
+            else:
+                # Only device-level fields count. USN and role differ between a
+                # device's NTs and its search responses, and devices answer from
+                # other, often ephemeral, source ports
+                old_host = previous['addr'][0] if previous['addr'] else None
+                new_host = addr[0] if addr else None
+                if (previous['location'], old_host) != (location, new_host):
+                    self._emit(UPDATED, device)
+        
+        heapq.heappush(self._expiry, (device['expires_at'], uuid))
+        if len(self._expiry) > 2 * len(self.devices) + 64:
+            self._compact()
+        return self._public(device)
+    
+    def remove(self, uuid: str, reason: str = BYEBYE) -> Optional[dict]:
+        """Forget a device, e.g. after ssdp:byebye; reason is the kind of change reported"""
+        device = self.devices.pop(uuid, None)
+        if device is not None:
+            self._unindex(uuid, device)
+            self._observe_size()
+            self._changes += 1
+            if self._feeds:
+                self._emit(reason, device)
+        return self._public(device)
+    
+    def remove_expired(self) -> List[str]:
+        """Remove devices past their cache expiry, returning their uuids"""
+        now = time.monotonic()
+        expired = []
+        heap = self._expiry
+        while heap and heap[0][0] <= now:
+            expires_at, uuid = heapq.heappop(heap)
+            device = self.devices.get(uuid)
+            # Entries for re-registered devices are stale; skip them
+            if device is not None and device['expires_at'] == expires_at:
+                self.remove(uuid, EXPIRED)
+                expired.append(uuid)
+        return expired
+    
+    async def start_sweeping(self, interval: float = 1.0):
+        """Remove expired devices in the background"""
+        if self._sweep_task is None:
+            self._sweep_task = asyncio.create_task(self._sweep_loop(interval))
+    
+    async def stop_sweeping(self):
+        """Stop the background sweep"""
+        if self._sweep_task:
+            self._sweep_task.cancel()
+            try:
+                await self._sweep_task
+            except asyncio.CancelledError:
+                pass
+            self._sweep_task = None
+    
+    async def save(self, path: str) -> int:
+        """Write a snapshot of the registry to path, returning the entry count
+        
+        The file is written next to path and renamed over it, so a crash
+        never leaves a truncated snapshot behind.
+        """
+        # Rows are captured on the loop; encoding and I/O happen off it
+        offset = time.time() - time.monotonic()
+        rows = [
+            [u, d['usn'], d['location'], d['role'], round(d['expires_at'] + offset, 3),
+             *(d['addr'] or (None, None))]
+            for u, d in self.devices.items()
+        ]
+        snapshot = {'version': SNAPSHOT_VERSION, 'saved_at': time.time(), 'devices': rows}
+        text = await asyncio.get_running_loop().run_in_executor(None, _encode, snapshot)
+        
+        import aiofiles
+        import aiofiles.os
+        temp_path = f"{path}.tmp"
+        async with aiofiles.open(temp_path, 'w', encoding="utf-8") as file:
+            await file.write(text)
+        await aiofiles.os.replace(temp_path, path)
+        return len(rows)
+    
+    async def load(self, path: str) -> int:
+        """Restore unexpired devices from a snapshot, returning how many were added
+        
+        Devices already in the registry are newer than the snapshot and are
+        kept as they are. A missing or unreadable snapshot restores nothing.
+        """
+        import aiofiles
+        try:
+            async with aiofiles.open(path, 'r', encoding="utf-8") as file:
+                text = await file.read()
+        except FileNotFoundError:
+            return 0
+        except OSError as e:
+            log.warning("snapshot", "Ignoring unreadable snapshot %s: %s", path, e)
+            return 0
+        
+        try:
+            # Decoding 100k rows takes a while; keep it off the loop
+            snapshot = await asyncio.get_running_loop().run_in_executor(None, json.loads, text)
+        except ValueError as e:
+            log.warning("snapshot", "Ignoring unreadable snapshot %s: %s", path, e)
+            return 0
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            log.warning("snapshot", "Ignoring snapshot %s with version %s", path, snapshot.get('version'))
+            return 0
+        
+        before = len(self.devices)
+        restored = self._restore(snapshot['devices'])
+        if restored:
+            # One heapify instead of a push per entry
+            self._compact()
+            self._observe_size()
+            self._changes += 1
+            if self._feeds:
+                # _restore() only appends, so the restored devices come last
+                for device in list(self.devices.values())[before:]:
+                    self._emit(ADDED, device)
+        return restored
+    
+    async def start_snapshots(self, path: str, interval: float = 60.0):
+        """Save a snapshot to path every interval seconds, when something changed"""
+        if self._snapshot_task is None:
+            self._snapshot_task = asyncio.create_task(self._snapshot_loop(path, interval))
+    
+    async def stop_snapshots(self):
+        """Stop the periodic snapshots, saving one last time"""
+        if self._snapshot_task:
+            self._snapshot_task.cancel()
+            try:
+                await self._snapshot_task
+            except asyncio.CancelledError:
+                pass
+            self._snapshot_task = None
+    
+    def set_description(self, uuid: str, location: str, description: dict) -> bool:
+        """Attach a fetched description, unless the device has moved to another LOCATION"""
+        device = self.devices.get(uuid)
+        if device is None or device['location'] != location:
+            return False
+        changed = device['description'] != description
+        device['description'] = description
+        if changed and self._feeds:
+            self._emit(UPDATED, device)
+        return True
+    
+    def subscribe_changes(self, callback: Callable[[List[Change]], None], tick: float = 1.0,
+                          snapshot: bool = False, role: Optional[str] = None) -> ChangeFeed:
+        """Get batches of (kind, device) changes at most every tick seconds
+        
+        With snapshot, the first batch reports every current device as
+        added, so a subscriber never has to copy the table itself.
+        """
+        feed = ChangeFeed(callback, tick, role)
+        self._feeds.append(feed)
+        if snapshot:
+            feed.snapshot(self.get_all_devices())
+        return feed
+    
+    def unsubscribe_changes(self, feed: ChangeFeed):
+        feed.close()
+        self._feeds = [f for f in self._feeds if f is not feed]
+    
+    def get_expiring(self, within: float) -> List[dict]:
+        """Get devices whose cache expires in the next `within` seconds"""
+        limit = time.monotonic() + within
+        return [self._public(d) for d in self.devices.values() if d['expires_at'] <= limit]
+    
+    def get_device(self, uuid: str) -> Optional[dict]:
+        return self._public(self.devices.get(uuid))
+    
+    def get_device_by_usn(self, usn: str) -> Optional[dict]:
+        uuid = self._by_usn.get(usn)
+        if uuid is None and self.compact and usn.startswith('uuid:'):
+            # Compact registries don't index uuid:... USNs; the uuid is in them
+            device = self.devices.get(usn[5:].split('::', 1)[0])
+            return self._public(device) if device is not None and device['usn'] == usn else None
+        return self._public(self.devices.get(uuid)) if uuid else None
+    
+    def get_devices_by_address(self, host: str) -> List[dict]:
+        """Get all devices announced from a source IP"""
+        uuids = self._by_host.get(host, ())
+        if type(uuids) is str:
+            return [self._public(self.devices[uuids])]
+        return [self._public(self.devices[u]) for u in uuids]
     
     def get_devices_by_role(self, role: str):
         """Get all devices matching a role"""
-        return [d for d in self.devices.values() if role in d.get('role', '')]
\ No newline at end of file
+        # Substring match over the distinct roles only, not over every device
+        return [self._public(self.devices[u]) for r, uuids in self._by_role.items() if role in r for u in uuids]
+    
+    def get_all_devices(self) -> List[dict]:
+        if self.compact:
+            return [dict(d) for d in self.devices.values()]
+        return list(self.devices.values())
+    
+    def __len__(self):
+        return len(self.devices)
+    
+    def _index(self, uuid: str, device: dict):
+        if device['role']:
+            self._by_role.setdefault(device['role'], set()).add(uuid)
+        usn = device['usn']
+        if usn and not (self.compact and usn.startswith('uuid:')):
+            self._by_usn[usn] = uuid
+        if device['addr']:
+            host = device['addr'][0]
+            if not self.compact:
+                self._by_host.setdefault(host, set()).add(uuid)
+            else:
+                # Most hosts run one device; a set apiece would outweigh the record
+                uuids = self._by_host.get(host)
+                if uuids is None or uuids == uuid:
+                    self._by_host[host] = uuid
+                elif type(uuids) is str:
+                    self._by_host[host] = {uuids, uuid}
+                else:
+                    uuids.add(uuid)
+    
+    def _unindex(self, uuid: str, device: dict):
+        if device['role']:
+            self._discard(self._by_role, device['role'], uuid)
+        if device['usn'] and self._by_usn.get(device['usn']) == uuid:
+            del self._by_usn[device['usn']]
+        if device['addr']:
+            host = device['addr'][0]
+            uuids = self._by_host.get(host)
+            if uuids == uuid:
+                del self._by_host[host]
+            elif type(uuids) is not str:
+                self._discard(self._by_host, host, uuid)
+    
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, uuid: str):
+        uuids = index.get(key)
+        if uuids is not None:
+            uuids.discard(uuid)
+            if not uuids:
+                del index[key]
+    
+    def _record(self, uuid: str, usn: Optional[str], location: Optional[str], role: Optional[str],
+                expires_at: float, addr) -> DeviceRecord:
+        intern = sys.intern
+        if addr is not None:
+            addr = (intern(addr[0]), addr[1])
+        # uuid and location are unique per device: interning them would only grow the intern table
+        return DeviceRecord(uuid, usn, location, intern(role) if role else role, expires_at, addr)
+    
+    def _emit(self, kind: str, device: dict):
+        device = self._public(device)
+        for feed in self._feeds:
+            feed.push(kind, device)
+    
+    def _public(self, device: Optional[dict]) -> Optional[dict]:
+        """What the API hands out: compact records are copied into plain dicts"""
+        if self.compact and device is not None:
+            return dict(device)
+        return device
+    
+    def _observe_size(self):
+        if self.metrics is not None and self.metrics.enabled:
+            self.metrics.registry_size.observe(len(self.devices))
+    
+    def _compact(self):
+        """Drop stale heap entries left behind by re-registrations"""
+        self._expiry = [(d['expires_at'], u) for u, d in self.devices.items()]
+        heapq.heapify(self._expiry)
+    
+    def _restore(self, rows: List[list]) -> int:
+        now = time.time()
+        offset = time.monotonic() - now
+        devices, by_role, by_usn, by_host = self.devices, self._by_role, self._by_usn, self._by_host
+        restored = 0
+        if self.compact:
+            for uuid, usn, location, role, expires, host, port in rows:
+                if expires <= now or uuid in devices:
+                    continue
+                device = self._record(uuid, usn, location, role, expires + offset,
+                                      (host, port) if host else None)
+                devices[device.uuid] = device
+                self._index(device.uuid, device)
+                restored += 1
+            return restored
+        
+        # _index() inlined: this loop runs once per entry, up to 100k times
+        for uuid, usn, location, role, expires, host, port in rows:
+            if expires <= now or uuid in devices:
+                continue
+            devices[uuid] = {
+                'uuid': uuid,
+                'usn': usn,
+                'location': location,
+                'role': role,
+                'expires_at': expires + offset,
+                'addr': (host, port) if host else None,
+                'description': None
+            }
+            if role:
+                uuids = by_role.get(role)
+                if uuids is None:
+                    by_role[role] = {uuid}
+                else:
+                    uuids.add(uuid)
+            if usn:
+                by_usn[usn] = uuid
+            if host:
+                uuids = by_host.get(host)
+                if uuids is None:
+                    by_host[host] = {uuid}
+                else:
+                    uuids.add(uuid)
+            restored += 1
+        return restored
+    
+    async def _snapshot_loop(self, path: str, interval: float):
+        saved = self._changes
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                if self._changes != saved:
+                    saved = self._changes
+                    await self._save_logged(path)
+        finally:
+            if self._changes != saved:
+                await self._save_logged(path)
+    
+    async def _save_logged(self, path: str):
+        try:
+            await self.save(path)
+        except OSError as e:
+            log.warning("snapshot", "Saving snapshot %s failed: %s", path, e)
+    
+    async def _sweep_loop(self, interval: float):
+        while True:
+            self.remove_expired()
+            delay = interval
+            if self._expiry:
+                delay = min(interval, max(0.0, self._expiry[0][0] - time.monotonic()))
+            await asyncio.sleep(delay)
+
+
+def _encode(snapshot: dict) -> str:
+    return json.dumps(snapshot, separators=(',', ':'))
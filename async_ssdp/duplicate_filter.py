@@ -0,0 +1,65 @@
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple
+
+Address = Tuple[str, int]
+
+class DuplicateFilter:
+    """Recognises repeats of a datagram from the same source within a window
+    
+    UDA has devices send every NOTIFY and search response several times.
+    Entries are keyed on the hash of the raw bytes plus the source address,
+    so no payload is kept, and expire `window` seconds after the first
+    copy; a repeat does not extend the window. At most `maxsize` entries
+    are held, the oldest being evicted first.
+    """
+    
+    def __init__(self, window: float = 1.0, maxsize: int = 4096):
+        self.window = window
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._seen: Set[Tuple[int, Address]] = set()
+        self._order: Deque[Tuple[float, Tuple[int, Address]]] = deque()  # (expires_at, key)
+    
+    def is_duplicate(self, data: bytes, addr: Address, now: Optional[float] = None) -> bool:
+        """Check a datagram, remembering it if it is new
+        
+        `now` defaults to time.monotonic(); any clock works as long as it
+        never goes backwards for one filter.
+        """
+        if now is None:
+            now = time.monotonic()
+        order = self._order
+        seen = self._seen
+        while order and order[0][0] <= now:
+            seen.discard(order.popleft()[1])
+        
+        key = (hash(data), addr)
+        if key in seen:
+            self.hits += 1
+            return True
+        
+        if len(order) >= self.maxsize:
+            seen.discard(order.popleft()[1])
+            self.evicted += 1
+        seen.add(key)
+        order.append((now + self.window, key))
+        self.misses += 1
+        return False
+    
+    def clear(self):
+        self._seen.clear()
+        self._order.clear()
+    
+    def __len__(self):
+        return len(self._order)
+    
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evicted': self.evicted,
+            'size': len(self._order),
+        }
@@ -1,31 +1,135 @@
 import asyncio
-from typing import Callable, List, Tuple
+import time
+from typing import Callable, Dict, List, Optional, Tuple
 
+from .log import get_logger
+from .message_filter import CombinedMatcher, MessageFilter
 from .parsed_message import ParsedMessage, ParsedMessageType
 
+log = get_logger(__name__)
+
+class Subscription:
+    """A subscriber, classified once when it subscribes"""
+    
+    __slots__ = ('callback', 'message_types', 'is_async', 'inline', 'timeout', 'name', 'filter')
+    
+    def __init__(self, callback: Callable, message_types: List[ParsedMessageType],
+                 inline: bool = False, timeout: Optional[float] = None,
+                 filter: Optional[MessageFilter] = None):
+        self.callback = callback
+        self.message_types = message_types
+        self.filter = filter
+        self.is_async = asyncio.iscoroutinefunction(callback)
+        # Only sync callbacks can run inline on the loop
+        self.inline = inline and not self.is_async
+        self.timeout = timeout
+        # Label for per-subscriber metrics
+        self.name = getattr(callback, '__qualname__', None) or repr(callback)
+    
+    def accepts(self, message_type: ParsedMessageType) -> bool:
+        return not self.message_types or message_type in self.message_types
+
+
 class EventBus:
-    """Simple event bus for message distribution"""
+    """Simple event bus for message distribution
+    
+    Subscribers are indexed by message type, so publishing only visits the
+    interested ones. Deliveries run concurrently; a failing or slow
+    subscriber is reported and cut off by its timeout without holding up
+    the others. Sync callbacks go through the default executor unless they
+    subscribe with inline=True, in which case they run directly on the loop;
+    coroutine callbacks always run on the loop, and inline is ignored for
+    them (with a warning).
+    With enabled `metrics`, each delivery's duration is recorded per
+    subscriber. `matcher` combines every subscriber's types and filters
+    for checking raw datagrams before they are parsed; it is None while
+    some subscriber takes everything.
+    """
     
-    def __init__(self):
-        self.subscribers: List[Tuple[Callable, List[ParsedMessageType]]] = []
+    def __init__(self, timeout: Optional[float] = None, metrics=None):
+        self.subscribers: List[Subscription] = []
+        self.timeout = timeout
+        self.metrics = metrics
+        self.errors = 0
+        self.timeouts = 0
+        self._by_type: Dict[ParsedMessageType, Tuple[Subscription, ...]] = {}
+        self.matcher: Optional[CombinedMatcher] = None
+        self._reindex()
     
-    def subscribe(self, callback: Callable, message_types: List[ParsedMessageType] = None):
-        """Subscribe to messages with optional type filtering"""
+    def subscribe(self, callback: Callable, message_types: List[ParsedMessageType] = None,
+                  inline: bool = False, timeout: Optional[float] = None,
+                  filter: Optional[MessageFilter] = None):
+        """Subscribe to messages with optional type and content filtering"""
         filters = message_types or []
-        self.subscribers.append((callback, filters))
+        subscription = Subscription(callback, filters, inline, timeout, filter)
+        if inline and subscription.is_async:
+            log.warning("inline", "inline=True has no effect for coroutine subscriber %s; "
+                        "it always runs on the loop", subscription.name)
+        self.subscribers.append(subscription)
+        self._reindex()
     
     def unsubscribe(self, callback: Callable):
         """Unsubscribe from messages"""
-        self.subscribers = [(cb, filters) for cb, filters in self.subscribers if cb != callback]
+        self.subscribers = [s for s in self.subscribers if s.callback != callback]
+        self._reindex()
     
     async def publish(self, message: ParsedMessage, addr: Tuple[str, int]):
         """Publish a message to all interested subscribers"""
-        for callback, filters in self.subscribers:
-            # If no filters, accept all messages
-            if not filters or message.message_type in filters:
-                if asyncio.iscoroutinefunction(callback):
-                    await callback(message, addr)
-                else:
-                    await asyncio.get_event_loop().run_in_executor(
-                        None, callback, message, addr
-                    )
\ No newline at end of file
+        pending = []
+        metrics = self.metrics
+        timed = metrics is not None and metrics.enabled
+        for subscription in self._by_type.get(message.message_type, ()):
+            if subscription.filter is not None and not subscription.filter.matches(message, addr):
+                continue
+            if subscription.inline:
+                started = time.perf_counter() if timed else 0.0
+                try:
+                    subscription.callback(message, addr)
+                except Exception as e:
+                    self._report_error(subscription, e)
+                if timed:
+                    metrics.observe_dispatch(subscription.name, time.perf_counter() - started)
+            else:
+                pending.append(self._deliver(subscription, message, addr))
+        
+        if len(pending) == 1:
+            await pending[0]
+        elif pending:
+            await asyncio.gather(*pending)
+    
+    async def _deliver(self, subscription: Subscription, message: ParsedMessage, addr: Tuple[str, int]):
+        metrics = self.metrics
+        timed = metrics is not None and metrics.enabled
+        started = time.perf_counter() if timed else 0.0
+        try:
+            if subscription.is_async:
+                result = subscription.callback(message, addr)
+            else:
+                result = asyncio.get_running_loop().run_in_executor(
+                    None, subscription.callback, message, addr
+                )
+            
+            timeout = subscription.timeout if subscription.timeout is not None else self.timeout
+            if timeout is None:
+                await result
+            else:
+                await asyncio.wait_for(result, timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            log.warning("timeout", "Subscriber %s timed out", subscription.name)
+        except Exception as e:
+            self._report_error(subscription, e)
+        if timed:
+            metrics.observe_dispatch(subscription.name, time.perf_counter() - started)
+    
+    def _report_error(self, subscription: Subscription, exc: Exception):
+        self.errors += 1
+        log.warning("subscriber", "Subscriber %s failed: %s", subscription.name, exc)
+    
+    def _reindex(self):
+        self._by_type = {
+            message_type: tuple(s for s in self.subscribers if s.accepts(message_type))
+            for message_type in ParsedMessageType
+        }
+        matcher = CombinedMatcher((s.message_types, s.filter) for s in self.subscribers)
+        self.matcher = None if matcher.accepts_all else matcher
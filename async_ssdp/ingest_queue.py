@@ -0,0 +1,138 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Literal, Tuple
+
+OverflowPolicy = Literal["drop_newest", "drop_oldest", "fair_share"]
+
+Datagram = Tuple[bytes, Tuple[str, int], float]  # data, addr, received_at
+
+class IngestQueue:
+    """Bounded datagram queue between the protocol and the event bus
+    
+    When full, the overflow policy decides what is lost:
+    drop_newest rejects the incoming datagram, drop_oldest evicts the
+    oldest queued one, and fair_share keeps one queue per source host,
+    serves them round-robin and trims the longest one, so a single noisy
+    host cannot starve the rest.
+    """
+    
+    def __init__(self, maxsize: int = 1024, policy: OverflowPolicy = "drop_oldest"):
+        if policy not in ("drop_newest", "drop_oldest", "fair_share"):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.enqueued = 0
+        self.dropped = 0
+        self.processed = 0
+        self.max_depth = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self._size = 0
+        self._queue: Deque[Datagram] = deque()
+        self._sources: "OrderedDict[str, Deque[Datagram]]" = OrderedDict()
+        self._getters: Deque[asyncio.Future] = deque()
+    
+    def qsize(self) -> int:
+        return self._size
+    
+    def put_nowait(self, data: bytes, addr: Tuple[str, int]) -> bool:
+        """Queue a datagram; returns False if the datagram itself was dropped"""
+        item = (data, addr, time.perf_counter())
+        accepted = True
+        
+        if self.policy == "fair_share":
+            accepted = self._put_fair(item)
+        elif self._size < self.maxsize:
+            self._queue.append(item)
+            self._size += 1
+        elif self.policy == "drop_oldest":
+            self._queue.popleft()
+            self._queue.append(item)
+            self.dropped += 1
+        else:
+            accepted = False
+        
+        if accepted:
+            self.enqueued += 1
+            if self._size > self.max_depth:
+                self.max_depth = self._size
+            self._wakeup_next()
+        else:
+            self.dropped += 1
+        return accepted
+    
+    async def get(self) -> Datagram:
+        """Wait for the next datagram"""
+        while not self._size:
+            getter = asyncio.get_running_loop().create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except asyncio.CancelledError:
+                getter.cancel()
+                try:
+                    self._getters.remove(getter)
+                except ValueError:
+                    pass
+                # Pass the wakeup on if we were woken and then cancelled
+                if self._size and not getter.cancelled():
+                    self._wakeup_next()
+                raise
+        self._size -= 1
+        if self.policy != "fair_share":
+            return self._queue.popleft()
+        
+        host, queue = next(iter(self._sources.items()))
+        item = queue.popleft()
+        if queue:
+            self._sources.move_to_end(host)
+        else:
+            del self._sources[host]
+        return item
+    
+    def task_done(self, received_at: float):
+        """Record that a datagram went all the way through dispatch"""
+        latency = time.perf_counter() - received_at
+        self.processed += 1
+        self.latency_total += latency
+        if latency > self.latency_max:
+            self.latency_max = latency
+    
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'depth': self._size,
+            'max_depth': self.max_depth,
+            'enqueued': self.enqueued,
+            'dropped': self.dropped,
+            'processed': self.processed,
+            'avg_dispatch_latency': self.latency_total / self.processed if self.processed else 0.0,
+            'max_dispatch_latency': self.latency_max,
+        }
+    
+    def _put_fair(self, item: Datagram) -> bool:
+        host = item[1][0]
+        if self._size >= self.maxsize:
+            incoming = len(self._sources.get(host, ()))
+            longest_host, longest = max(self._sources.items(), key=lambda kv: len(kv[1]))
+            if incoming >= len(longest):
+                return False
+            longest.pop()
+            if not longest:
+                del self._sources[longest_host]
+            self._size -= 1
+            self.dropped += 1
+        
+        queue = self._sources.get(host)
+        if queue is None:
+            queue = self._sources[host] = deque()
+        queue.append(item)
+        self._size += 1
+        return True
+    
+    def _wakeup_next(self):
+        while self._getters:
+            getter = self._getters.popleft()
+            if not getter.done():
+                getter.set_result(None)
+                break
@@ -0,0 +1,51 @@
+import logging
+import time
+from typing import Dict, List
+
+class RateLimitedLogger:
+    """Wraps a logging.Logger so one noisy call site cannot flood the log
+    
+    Each key (usually a short name for the call site) may emit `burst`
+    records per `interval` seconds. Records past that are counted, and the
+    count is logged once the next window opens. A level the logger has
+    disabled costs a single isEnabledFor() check.
+    """
+    
+    def __init__(self, logger: logging.Logger, interval: float = 10.0, burst: int = 5):
+        self.logger = logger
+        self.interval = interval
+        self.burst = burst
+        self._windows: Dict[str, List] = {}  # key -> [opened_at, emitted, suppressed]
+    
+    def debug(self, key: str, msg: str, *args, **kwargs):
+        self.log(logging.DEBUG, key, msg, *args, **kwargs)
+    
+    def info(self, key: str, msg: str, *args, **kwargs):
+        self.log(logging.INFO, key, msg, *args, **kwargs)
+    
+    def warning(self, key: str, msg: str, *args, **kwargs):
+        self.log(logging.WARNING, key, msg, *args, **kwargs)
+    
+    def error(self, key: str, msg: str, *args, **kwargs):
+        self.log(logging.ERROR, key, msg, *args, **kwargs)
+    
+    def log(self, level: int, key: str, msg: str, *args, **kwargs):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            if window is not None and window[2]:
+                self.logger.log(level, "%s: %d similar messages suppressed", key, window[2])
+            window = self._windows[key] = [now, 0, 0]
+        
+        if window[1] < self.burst:
+            window[1] += 1
+            self.logger.log(level, msg, *args, **kwargs)
+        else:
+            window[2] += 1
+
+
+def get_logger(name: str) -> RateLimitedLogger:
+    """Rate-limited wrapper around logging.getLogger(name)"""
+    return RateLimitedLogger(logging.getLogger(name))
@@ -1,14 +1,43 @@
 
-import platform
-from typing import List
-from email.utils import formatdate
+import time
+from typing import Dict, List, Optional, Tuple
 
 from .message_parser import MessageType, MessageSubType
 
+_date_second = -1
+_date_value = b""
+
+def _http_date() -> bytes:
+    """RFC 1123 date for the DATE header, formatted at most once per second"""
+    global _date_second, _date_value
+    now = int(time.time())
+    if now != _date_second:
+        from email.utils import formatdate
+        _date_value = formatdate(now, usegmt=True).encode("ascii")
+        _date_second = now
+    return _date_value
+
+
+_server_os = None
+
+def _os_signature() -> str:
+    """OS name/version for the SERVER header, looked up once per process"""
+    global _server_os
+    if _server_os is None:
+        import platform
+        _server_os = f"{platform.system()}/{platform.version()}"
+    return _server_os
+
 class MessageBuilder:
-    """Builds SSDP protocol messages"""
+    """Builds SSDP protocol messages
+    
+    The headers that never change for a service are rendered to bytes once,
+    at construction time (call compile() after changing an attribute).
+    Building a message only splices in NTS, ST, MX or DATE, and the result
+    is bytes ready for the transport.
+    """
     
-    def __init__(self, device: str, uuid: str, location: str, schema: str, 
+    def __init__(self, device: str, uuid: str, location: str, schema: str,
                  multicast_group: str, multicast_port: int, cache: int = 1800):
         self.device = device
         self.uuid = uuid
@@ -18,60 +47,78 @@ class MessageBuilder:
         self.multicast_port = multicast_port
         self.cache = cache
         self.json_upnp = "json" in schema
+        self.compile()
     
-    def build_notify(self, type: MessageType, sub_type: MessageSubType = None) -> str:
-        """Build a NOTIFY message (alive/byebye)"""
-        os_name = platform.system()
-        os_release = platform.version()
+    def compile(self):
+        """Pre-render the static parts of every message"""
         server_upnp = "json-UPnP/1.0" if self.json_upnp else "UPnp/1.0"
+        server = f"SERVER: {_os_signature()} {server_upnp} {self.device}/1.0"
+        host = f"HOST: {self.multicast_group}:{self.multicast_port}"
         
-        nts = f"{type}" if not sub_type else f"{type}::{sub_type}"
-        
-        args = [
+        self._notify_head = self._join([
             "NOTIFY * HTTP/1.0",
-            f"HOST: {self.multicast_group}:{self.multicast_port}",
+            host,
             f"NT: urn:{self.schema}:{self.device}:1",
-            f"NTS: ssdp:{nts}",
+            "NTS: ssdp:",
+        ])
+        self._notify_tail = b"\r\n" + self._build_message([
             f"LOCATION: {self.location}",
             f"USN: uuid:{self.uuid}::{self.schema}:{self.device}:1",
             f"CACHE-CONTROL: max-age={self.cache}",
-            f"SERVER: {os_name}/{os_release} {server_upnp} {self.device}/1.0"
-        ]
+            server,
+        ])
+        self._notify_cache: Dict[Tuple[MessageType, Optional[MessageSubType]], bytes] = {}
         
-        return self._build_message(args)
-    
-    def build_msearch_request(self, target: str, mx: int = 5) -> str:
-        """Build an M-SEARCH request message"""
-        args = [
+        self._msearch_head = self._join([
             "M-SEARCH * HTTP/1.1",
-            f"HOST: {self.multicast_group}:{self.multicast_port}",
-            f"MAN: \"ssdp:discover\"",
-            f"MX: {mx}",
-            f"ST: {target}"
-        ]
+            host,
+            "MAN: \"ssdp:discover\"",
+            "MX: ",
+        ])
         
-        return self._build_message(args)
-    
-    def build_msearch_response(self, target: str) -> str:
-        """Build an M-SEARCH response message"""
-        os_name = platform.system()
-        os_release = platform.version()
-        server_upnp = "json-UPnP/1.0" if self.json_upnp else "UPnp/1.0"
-        
-        args = [
+        self._response_head = self._join([
             "HTTP/1.1 200 OK",
             f"CACHE-CONTROL: max-age={self.cache}",
-            f"DATE: {formatdate(usegmt=True)}",
-            f"EXT: ",
+            "DATE: ",
+        ])
+        self._response_middle = b"\r\n" + self._join([
+            "EXT: ",
             f"LOCATION: {self.location}",
-            f"SERVER: {os_name}/{os_release} {server_upnp} {self.device}/1.0",
-            f"ST: ssdp:{target}",
+            server,
+            "ST: ",
+        ])
+        self._response_tail = b"\r\n" + self._build_message([
             f"USN: uuid:{self.uuid}::{self.schema}:device:{self.device}",
-        ]
-        
-        return self._build_message(args)
+        ])
+    
+    def build_notify(self, type: MessageType, sub_type: MessageSubType = None) -> bytes:
+        """Build a NOTIFY message (alive/byebye)"""
+        key = (type, sub_type)
+        message = self._notify_cache.get(key)
+        if message is None:
+            nts = f"{type}" if not sub_type else f"{type}::{sub_type}"
+            message = self._notify_head + nts.encode("utf-8") + self._notify_tail
+            self._notify_cache[key] = message
+        return message
+    
+    def build_msearch_request(self, target: str, mx: int = 5) -> bytes:
+        """Build an M-SEARCH request message"""
+        return b"".join((self._msearch_head, f"{mx}\r\nST: {target}\r\n\r\n".encode("utf-8")))
+    
+    def build_msearch_response(self, target: str) -> bytes:
+        """Build an M-SEARCH response message"""
+        return b"".join((
+            self._response_head, _http_date(),
+            self._response_middle, target.encode("utf-8"),
+            self._response_tail
+        ))
+    
+    @staticmethod
+    def _join(args: List[str]) -> bytes:
+        """Join header lines without the closing blank line"""
+        return "\r\n".join(args).encode("utf-8")
     
     @staticmethod
-    def _build_message(args: List[str]) -> str:
+    def _build_message(args: List[str]) -> bytes:
         """Build a message from a list of headers"""
-        return "\r\n".join(args) + "\r\n\r\n"
\ No newline at end of file
+        return "\r\n".join(args).encode("utf-8") + b"\r\n\r\n"
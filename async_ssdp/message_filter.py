@@ -0,0 +1,191 @@
+import ipaddress
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .parsed_message import ParsedMessage, ParsedMessageType
+
+Address = Tuple[str, int]
+
+_HOST_CACHE_SIZE = 4096
+
+class MessageFilter:
+    """Declarative condition on a message, usable before and after parsing
+    
+    target matches NT or ST exactly, target_prefix matches their start,
+    usn_prefix the start of USN, and subnet (one network or several) the
+    source address. All given conditions must hold. matches() checks a
+    ParsedMessage; matches_raw() checks the datagram bytes and never
+    rejects a datagram that matches() would accept once parsed.
+    """
+    
+    def __init__(self, target: Optional[str] = None, target_prefix: Optional[str] = None,
+                 usn_prefix: Optional[str] = None, subnet: Union[str, Sequence[str], None] = None):
+        self.target = target
+        self.target_prefix = target_prefix
+        self.usn_prefix = usn_prefix
+        subnets = [subnet] if isinstance(subnet, str) else list(subnet or ())
+        self.networks = tuple(ipaddress.ip_network(s, strict=False) for s in subnets)
+        self._hosts: Dict[str, bool] = {}
+        self._checks: List[_HeaderCheck] = []
+        if target is not None:
+            self._checks.append(_HeaderCheck((b"NT", b"ST"), target, True))
+        if target_prefix is not None:
+            self._checks.append(_HeaderCheck((b"NT", b"ST"), target_prefix, False))
+        if usn_prefix is not None:
+            self._checks.append(_HeaderCheck((b"USN",), usn_prefix, False))
+    
+    @property
+    def literal(self) -> Optional[bytes]:
+        """A byte string every matching datagram contains, if there is one"""
+        value = self.target or self.target_prefix or self.usn_prefix
+        return value.encode("utf-8") if value else None
+    
+    def matches(self, message: ParsedMessage, addr: Address) -> bool:
+        if self.networks and not self.host_allowed(addr[0]):
+            return False
+        if self.target is not None or self.target_prefix is not None:
+            targets = [t for t in (message.get_header('NT'), message.get_header('ST')) if t]
+            if self.target is not None and self.target not in targets:
+                return False
+            if self.target_prefix is not None and not any(t.startswith(self.target_prefix) for t in targets):
+                return False
+        if self.usn_prefix is not None and not (message.get_usn() or '').startswith(self.usn_prefix):
+            return False
+        return True
+    
+    def matches_raw(self, data: bytes, addr: Address) -> bool:
+        if self.networks and not self.host_allowed(addr[0]):
+            return False
+        for check in self._checks:
+            if not check.search(data):
+                return False
+        return True
+    
+    def host_allowed(self, host: str) -> bool:
+        allowed = self._hosts.get(host)
+        if allowed is None:
+            try:
+                ip = ipaddress.ip_address(host)
+                allowed = any(ip in network for network in self.networks)
+            except ValueError:
+                allowed = False
+            if len(self._hosts) >= _HOST_CACHE_SIZE:
+                self._hosts.clear()
+            self._hosts[host] = allowed
+        return allowed
+    
+    def __repr__(self):
+        fields = [f"{k}={v!r}" for k, v in (('target', self.target), ('target_prefix', self.target_prefix),
+                                             ('usn_prefix', self.usn_prefix)) if v is not None]
+        if self.networks:
+            fields.append(f"subnet={[str(n) for n in self.networks]!r}")
+        return f"MessageFilter({', '.join(fields)})"
+
+
+class CombinedMatcher:
+    """Every subscriber's interest folded into one check on raw datagrams
+    
+    Built from (message_types, filter) pairs, one per subscriber. Message
+    types wanted without a filter are accepted on the first line alone.
+    Otherwise, when every filter for the type has a literal (a target or
+    USN prefix), the filters are grouped by literal: one substring search
+    per literal rules out whole groups, and only the filters whose literal
+    occurs in the datagram are checked in full.
+    """
+    
+    def __init__(self, interests: Iterable[Tuple[Sequence[ParsedMessageType], Optional[MessageFilter]]]):
+        interests = [(frozenset(types or ParsedMessageType), f) for types, f in interests]
+        self.open_types = set()
+        for types, message_filter in interests:
+            if message_filter is None:
+                self.open_types |= types
+        
+        # One row per message type: None accepts everything, otherwise
+        # ((literal or None, filters), ...); an empty row rejects everything
+        rows = {}
+        for message_type in ParsedMessageType:
+            if message_type in self.open_types:
+                rows[message_type] = None
+                continue
+            filters = [f for types, f in interests if f is not None and message_type in types]
+            rows[message_type] = _group(filters)
+        self._notify = rows[ParsedMessageType.NOTIFY]
+        self._msearch = rows[ParsedMessageType.MSEARCH]
+        self._response = rows[ParsedMessageType.RESPONSE]
+        self._unknown = rows[ParsedMessageType.UNKNOWN]
+    
+    @property
+    def accepts_all(self) -> bool:
+        return len(self.open_types) == len(ParsedMessageType)
+    
+    def matches(self, data: bytes, addr: Address) -> bool:
+        """False only if no subscriber could want this datagram"""
+        # The parser's type detection, without hashing enum members
+        if data.startswith(b'NOTIFY'):
+            row = self._notify
+        elif data.startswith(b'M-SEARCH'):
+            row = self._msearch
+        elif data.startswith(b'HTTP/1.1'):
+            row = self._response
+        elif data[:1].isspace():
+            return True  # leave odd framing to the parser
+        else:
+            row = self._unknown
+        if row is None:
+            return True
+        
+        for literal, filters in row:
+            if literal is None or literal in data:
+                for message_filter in filters:
+                    if message_filter.matches_raw(data, addr):
+                        return True
+        return False
+
+
+def _group(filters: List[MessageFilter]) -> Tuple[Tuple[Optional[bytes], Tuple[MessageFilter, ...]], ...]:
+    """Group filters under the shortest literal that their own literal contains"""
+    if not filters:
+        return ()
+    if not all(f.literal for f in filters):
+        return ((None, tuple(filters)),)
+    groups: Dict[bytes, List[MessageFilter]] = {}
+    for message_filter in sorted(filters, key=lambda f: len(f.literal)):
+        literal = message_filter.literal
+        key = next((l for l in groups if l in literal), literal)
+        groups.setdefault(key, []).append(message_filter)
+    return tuple((literal, tuple(group)) for literal, group in groups.items())
+
+
+class _HeaderCheck:
+    """Whether a header in `names` has `value` (or starts with it, unless exact)"""
+    
+    __slots__ = ('names', 'value', 'exact', 'canonical')
+    
+    def __init__(self, names: Tuple[bytes, ...], value: str, exact: bool):
+        self.names = names
+        self.value = value.encode("utf-8")
+        self.exact = exact
+        # The usual spelling of a match, which settles most datagrams with one search
+        end = b"\r\n" if exact else b""
+        self.canonical = tuple(b"\r\n" + name + b": " + self.value + end for name in names)
+    
+    def search(self, data: bytes) -> bool:
+        for canonical in self.canonical:
+            if canonical in data:
+                return True
+        
+        # Otherwise find the value and look at the rest of its line, with
+        # the parser's tolerance for whitespace and name case
+        value = self.value
+        pos = data.find(value)
+        while pos >= 0:
+            start = data.rfind(b"\n", 0, pos) + 1
+            name, sep, gap = data[start:pos].partition(b":")
+            if sep and not gap.strip() and name.strip().upper() in self.names:
+                if not self.exact:
+                    return True
+                end = pos + len(value)
+                line_end = data.find(b"\n", end)
+                if not data[end:line_end if line_end >= 0 else len(data)].strip():
+                    return True
+            pos = data.find(value, pos + 1)
+        return False
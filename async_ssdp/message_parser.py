@@ -1,30 +1,46 @@
-from typing import Optional, Literal
+from typing import Dict, Optional, Literal, Union
 
+from .log import get_logger
 from .parsed_message import ParsedMessage, ParsedMessageType
 
+log = get_logger(__name__)
+
+# Raw header name -> case-folded str; SSDP uses a small, stable set of names
+_NAME_CACHE: Dict[bytes, str] = {}
+_NAME_CACHE_SIZE = 256
+
+
 class MessageParser:
-    """Parses raw bytes into ParsedMessage objects"""
+    """Parses raw bytes into ParsedMessage objects
+    
+    Works on the datagram bytes: header names are case-folded once and
+    values are kept as bytes until read (see ParsedMessage.get_header).
+    Failures are counted by reason on `metrics` when one is given.
+    """
     
     @staticmethod
-    def parse(data: bytes) -> Optional[ParsedMessage]:
+    def parse(data: Union[bytes, bytearray, memoryview], metrics=None) -> Optional[ParsedMessage]:
         try:
-            text = data.decode('utf-8').strip()
-            if not text:
-                return None
+            if type(data) is not bytes:
+                data = bytes(data)
             
-            lines = text.split('\r\n')
-            if not lines:
+            data = data.strip()
+            end = data.find(b'\r\n\r\n')
+            lines = (data[:end] if end >= 0 else data).split(b'\r\n')
+            first_line = lines[0]
+            if not first_line:
+                if metrics is not None:
+                    metrics.parse_failed("empty")
                 return None
             
-            first_line = lines[0].strip()
             message_type = ParsedMessageType.UNKNOWN
             status_code = None
             
-            if first_line.startswith('NOTIFY'):
+            if first_line.startswith(b'NOTIFY'):
                 message_type = ParsedMessageType.NOTIFY
-            elif first_line.startswith('M-SEARCH'):
+            elif first_line.startswith(b'M-SEARCH'):
                 message_type = ParsedMessageType.MSEARCH
-            elif first_line.startswith('HTTP/1.1'):
+            elif first_line.startswith(b'HTTP/1.1'):
                 message_type = ParsedMessageType.RESPONSE
                 parts = first_line.split()
                 if len(parts) >= 2:
@@ -33,22 +49,25 @@ class MessageParser:
                     except ValueError:
                         pass
             
-            headers = {}
+            fields = {}
             for line in lines[1:]:
-                line = line.strip()
-                if not line:
+                name, sep, value = line.partition(b':')
+                if not sep:
                     continue
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    headers[key.strip()] = value.strip()
-            
-            return ParsedMessage(text, message_type, headers, status_code)
+                key = _NAME_CACHE.get(name)
+                if key is None:
+                    key = name.strip().decode('latin-1').lower()
+                    if len(_NAME_CACHE) < _NAME_CACHE_SIZE:
+                        _NAME_CACHE[name] = key
+                if key:
+                    fields[key] = value
             
-        except UnicodeDecodeError:
-            print("Failed to decode message as UTF-8")
-            return None
+            return ParsedMessage.from_raw(data, message_type, fields, status_code)
+        
         except Exception as e:
-            print(f"Error parsing message: {e}")
+            if metrics is not None:
+                metrics.parse_failed(type(e).__name__)
+            log.warning("parse", "Error parsing message: %s", e)
             return None
 
 
@@ -0,0 +1,195 @@
+import asyncio
+import bisect
+from typing import Callable, Dict, List, Sequence
+
+from .log import get_logger
+from .parsed_message import ParsedMessageType
+
+log = get_logger(__name__)
+
+# Seconds, for parse and dispatch times: 10us .. 1s
+LATENCY_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 0.1, 1.0)
+# Seconds, for responder delays, which are spread over MX (at most 5s)
+DELAY_BUCKETS = (0.01, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 4.0, 5.0)
+# Device counts
+SIZE_BUCKETS = (10, 100, 1000, 10000, 100000)
+
+class Histogram:
+    """Fixed-bucket histogram, in the shape Prometheus expects"""
+    
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+    
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+    
+    def cumulative(self) -> List[int]:
+        """Bucket counts as running totals, one per bound plus +Inf"""
+        total = 0
+        result = []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+    
+    def as_dict(self) -> Dict[str, float]:
+        return {'count': self.count, 'sum': self.sum, 'avg': self.sum / self.count if self.count else 0.0}
+
+
+class Metrics:
+    """Counters and histograms for an SSDPService
+    
+    Instrumented code checks `enabled` before measuring anything, so a
+    disabled Metrics costs one attribute read per datagram. `enabled` can
+    be flipped at any time. Collectors add gauges that are read only when
+    exporting (the ingest queue and transport stats are registered by the
+    service), and exporters are called with this object on export().
+    """
+    
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.datagrams_received = 0
+        self.datagrams_sent = 0
+        self.datagrams_filtered = 0
+        self.parse_failures: Dict[str, int] = {}
+        self.messages: Dict[ParsedMessageType, int] = {t: 0 for t in ParsedMessageType}
+        self.parse_time = Histogram(LATENCY_BUCKETS)
+        self.dispatch_latency: Dict[str, Histogram] = {}
+        self.responder_delay = Histogram(DELAY_BUCKETS)
+        self.registry_size = Histogram(SIZE_BUCKETS)
+        self._collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self._exporters: List[Callable[["Metrics"], None]] = []
+        self._export_task = None
+    
+    def parse_failed(self, reason: str):
+        self.parse_failures[reason] = self.parse_failures.get(reason, 0) + 1
+    
+    def observe_dispatch(self, subscriber: str, seconds: float):
+        histogram = self.dispatch_latency.get(subscriber)
+        if histogram is None:
+            histogram = self.dispatch_latency[subscriber] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+    
+    def add_collector(self, name: str, collect: Callable[[], Dict[str, float]]):
+        """Register a callable returning gauges, read on every export"""
+        self._collectors[name] = collect
+    
+    def remove_collector(self, name: str):
+        self._collectors.pop(name, None)
+    
+    def collect(self) -> Dict[str, Dict[str, float]]:
+        return {name: collect() for name, collect in self._collectors.items()}
+    
+    def add_exporter(self, exporter: Callable[["Metrics"], None]):
+        """Register a callable that export() hands this object to"""
+        self._exporters.append(exporter)
+    
+    def remove_exporter(self, exporter: Callable[["Metrics"], None]):
+        self._exporters = [e for e in self._exporters if e != exporter]
+    
+    def export(self):
+        """Run every exporter; a failing exporter is logged and skipped"""
+        for exporter in self._exporters:
+            try:
+                exporter(self)
+            except Exception as e:
+                log.warning("exporter", "Metrics exporter %r failed: %s", exporter, e)
+    
+    async def start_exporting(self, interval: float = 15.0):
+        """Call export() every interval seconds in the background"""
+        if self._export_task is None:
+            self._export_task = asyncio.create_task(self._export_loop(interval))
+    
+    async def stop_exporting(self):
+        """Stop the background export"""
+        if self._export_task:
+            self._export_task.cancel()
+            try:
+                await self._export_task
+            except asyncio.CancelledError:
+                pass
+            self._export_task = None
+    
+    def snapshot(self) -> dict:
+        """Everything as plain values, e.g. for JSON"""
+        return {
+            'datagrams_received': self.datagrams_received,
+            'datagrams_sent': self.datagrams_sent,
+            'datagrams_filtered': self.datagrams_filtered,
+            'parse_failures': dict(self.parse_failures),
+            'messages': {t.name.lower(): n for t, n in self.messages.items()},
+            'parse_time': self.parse_time.as_dict(),
+            'dispatch_latency': {s: h.as_dict() for s, h in self.dispatch_latency.items()},
+            'responder_delay': self.responder_delay.as_dict(),
+            'registry_size': self.registry_size.as_dict(),
+            **self.collect(),
+        }
+    
+    async def _export_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.export()
+
+
+def render_prometheus(metrics: Metrics, prefix: str = "ssdp") -> str:
+    """Render metrics in the Prometheus text exposition format"""
+    lines = []
+    
+    def header(name: str, kind: str, help: str):
+        lines.append(f"# HELP {prefix}_{name} {help}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+    
+    def histogram(name: str, h: Histogram, labels: str = ""):
+        sep = "," if labels else ""
+        for bound, total in zip(h.bounds + ("+Inf",), h.cumulative()):
+            lines.append(f'{prefix}_{name}_bucket{{{labels}{sep}le="{bound}"}} {total}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{prefix}_{name}_sum{suffix} {h.sum}")
+        lines.append(f"{prefix}_{name}_count{suffix} {h.count}")
+    
+    header("datagrams_received_total", "counter", "Datagrams received")
+    lines.append(f"{prefix}_datagrams_received_total {metrics.datagrams_received}")
+    header("datagrams_sent_total", "counter", "Datagrams sent")
+    lines.append(f"{prefix}_datagrams_sent_total {metrics.datagrams_sent}")
+    header("datagrams_filtered_total", "counter", "Datagrams no subscriber wanted, dropped before parsing")
+    lines.append(f"{prefix}_datagrams_filtered_total {metrics.datagrams_filtered}")
+    
+    header("parse_failures_total", "counter", "Datagrams that failed to parse, by reason")
+    for reason, count in sorted(metrics.parse_failures.items()):
+        lines.append(f'{prefix}_parse_failures_total{{reason="{_escape(reason)}"}} {count}')
+    
+    header("messages_total", "counter", "Parsed messages by type")
+    for message_type, count in metrics.messages.items():
+        lines.append(f'{prefix}_messages_total{{type="{message_type.name.lower()}"}} {count}')
+    
+    header("parse_seconds", "histogram", "Time to parse one datagram")
+    histogram("parse_seconds", metrics.parse_time)
+    
+    header("dispatch_seconds", "histogram", "Time a subscriber took to handle one message")
+    for subscriber, h in sorted(metrics.dispatch_latency.items()):
+        histogram("dispatch_seconds", h, f'subscriber="{_escape(subscriber)}"')
+    
+    header("responder_delay_seconds", "histogram", "Delay chosen before answering an M-SEARCH")
+    histogram("responder_delay_seconds", metrics.responder_delay)
+    
+    header("registry_devices", "histogram", "Registry size, observed on every change")
+    histogram("registry_devices", metrics.registry_size)
+    
+    for group, values in metrics.collect().items():
+        for key, value in values.items():
+            name = f"{group}_{key}"
+            header(name, "gauge", f"{group} {key}".replace("_", " "))
+            lines.append(f"{prefix}_{name} {value}")
+    
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
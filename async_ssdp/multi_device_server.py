@@ -0,0 +1,110 @@
+import uuid as uuid_module
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .announcement_scheduler import AnnouncementScheduler, RateLimiter
+from .message_builder import MessageBuilder
+from .parsed_message import ParsedMessageType
+from .ssdp_responder import Address, SSDPResponder
+from .ssdp_service import SSDPService
+
+class MultiDeviceServer:
+    """Hosts many device identities on one listener and one sender
+    
+    Every device gets its own MessageBuilder, but they share a single
+    SSDPService, one AnnouncementScheduler (jittered, spread over
+    `interval`) and one responder. All outgoing packets, announcements
+    and search responses alike, go through one RateLimiter capped at
+    `max_rate` packets per second; response_rate and response_burst are
+    the responder's per-searcher limits.
+    """
+    
+    def __init__(self, interval: float = 600.0, jitter: float = 0.1, initial_delay: float = 1.0,
+                 max_rate: float = 200.0, burst: int = 20, response_rate: float = 10.0,
+                 response_burst: int = 20, **kwargs):
+        kwargs.setdefault('device', 'multi-device-host')
+        kwargs.setdefault('uuid', str(uuid_module.uuid4()))
+        kwargs.setdefault('location', '')
+        self.service = SSDPService(**kwargs)
+        self.limiter = RateLimiter(max_rate, burst)
+        self.devices: Dict[str, MessageBuilder] = {}  # uuid -> builder
+        self._by_target: Dict[str, Set[str]] = {}  # search target -> uuids
+        self.scheduler = AnnouncementScheduler(
+            self.service.send_many, self._build_alive, interval, jitter, initial_delay, self.limiter
+        )
+        self.responder = MultiDeviceResponder(self, response_rate, response_burst)
+        self._running = False
+    
+    def add_device(self, device: str, uuid: str, location: str, json_upnp: bool = False,
+                   cache: int = 1800, targets: Iterable[str] = ()) -> MessageBuilder:
+        """Host a device; it answers searches for its URN, uuid:<uuid> and any extra targets"""
+        if uuid in self.devices:
+            self._unindex(uuid)
+        schema = "urn:schemas-json-upnp-org" if json_upnp else "urn:schemas-upnp-org"
+        host = self.service.message_builder
+        builder = MessageBuilder(device, uuid, location, schema,
+                                 host.multicast_group, host.multicast_port, cache)
+        self.devices[uuid] = builder
+        for target in (f"urn:schemas-upnp-org:device:{device}:1", f"uuid:{uuid}", *targets):
+            self._by_target.setdefault(target, set()).add(uuid)
+        self.scheduler.add(uuid)
+        return builder
+    
+    async def remove_device(self, uuid: str):
+        """Stop hosting a device and announce its byebye"""
+        builder = self.devices.get(uuid)
+        if builder is None:
+            return
+        self._unindex(uuid)
+        del self.devices[uuid]
+        self.scheduler.discard(uuid)
+        if self._running:
+            await self.limiter.send(self.service.send_many, [builder.build_notify('byebye')])
+    
+    def find_devices(self, target: str) -> List[MessageBuilder]:
+        """The hosted devices that answer a search for target"""
+        if target == "ssdp:all":
+            return list(self.devices.values())
+        return [self.devices[u] for u in self._by_target.get(target, ())]
+    
+    async def start(self):
+        await self.service.start_listening()
+        self.service.subscribe(self.responder.handle_search, [ParsedMessageType.MSEARCH])
+        await self.scheduler.start()
+        self._running = True
+    
+    async def stop(self):
+        """Stop announcing, send byebye for every device and close the service"""
+        self._running = False
+        self.responder.close()
+        await self.scheduler.stop()
+        byebyes = [b.build_notify('byebye') for b in self.devices.values()]
+        await self.limiter.send(self.service.send_many, byebyes)
+        await self.service.close()
+    
+    def _build_alive(self, uuid: str) -> Optional[bytes]:
+        builder = self.devices.get(uuid)
+        return builder.build_notify('alive') if builder is not None else None
+    
+    def _unindex(self, uuid: str):
+        for target in [t for t, uuids in self._by_target.items() if uuid in uuids]:
+            uuids = self._by_target[target]
+            uuids.discard(uuid)
+            if not uuids:
+                del self._by_target[target]
+
+
+class MultiDeviceResponder(SSDPResponder):
+    """SSDPResponder answering for every device a MultiDeviceServer hosts"""
+    
+    def __init__(self, server: MultiDeviceServer, rate: float = 10.0, burst: int = 20):
+        super().__init__(server.service, (), rate, burst)
+        self.server = server
+    
+    def _matches(self, target: Optional[str]) -> bool:
+        return target == "ssdp:all" and bool(self.server.devices) or target in self.server._by_target
+    
+    def _builders_for(self, target: str) -> List[MessageBuilder]:
+        return self.server.find_devices(target)
+    
+    async def _send(self, batch: List[Tuple[bytes, Address]]):
+        await self.server.limiter.send(self.service.send_many, batch)
@@ -1,7 +1,5 @@
 from enum import Enum
 from typing import Dict, Optional
-import aiofiles
-from pathlib import Path
 
 class ParsedMessageType(Enum):
     NOTIFY = "NOTIFY"
@@ -10,29 +8,81 @@ class ParsedMessageType(Enum):
     UNKNOWN = "UNKNOWN"
 
 
+_UNSET = object()
+
+
 class ParsedMessage:
-    """Represents a parsed multicast message"""
+    """Represents a parsed multicast message
+    
+    Messages produced by MessageParser keep the raw datagram and the raw
+    header values keyed by case-folded name; values are decoded on first
+    access and cached, as are the derived uuid, max-age and MX fields.
+    """
+    
+    __slots__ = ('message_type', 'status_code', '_raw', '_text', '_fields', '_headers',
+                 '_uuid', '_cache_control', '_max_wait')
     
     def __init__(self, text: str, message_type: ParsedMessageType, headers: Dict[str, str], status_code: Optional[int] = None):
-        self.text = text
         self.message_type = message_type
-        self.headers = headers
         self.status_code = status_code
+        self._raw = None
+        self._text = text
+        self._headers = headers
+        self._fields = {k.lower(): v for k, v in headers.items()}
+        self._uuid = self._cache_control = self._max_wait = _UNSET
+    
+    @classmethod
+    def from_raw(cls, raw: bytes, message_type: ParsedMessageType,
+                 fields: Dict[str, bytes], status_code: Optional[int] = None) -> "ParsedMessage":
+        """Build a message over a datagram; fields map folded name -> raw value"""
+        message = cls.__new__(cls)
+        message.message_type = message_type
+        message.status_code = status_code
+        message._raw = raw
+        message._text = None
+        message._headers = None
+        message._fields = fields
+        message._uuid = message._cache_control = message._max_wait = _UNSET
+        return message
+    
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self._raw.decode('utf-8', 'replace').strip()
+        return self._text
+    
+    @property
+    def headers(self) -> Dict[str, str]:
+        """All headers under their original names"""
+        if self._headers is None:
+            headers = {}
+            end = self._raw.find(b'\r\n\r\n')
+            for line in self._raw[:end if end >= 0 else None].strip().split(b'\r\n')[1:]:
+                name, sep, _ = line.partition(b':')
+                name = name.strip().decode('latin-1')
+                if sep and name:
+                    headers[name] = self.get_header(name)
+            self._headers = headers
+        return self._headers
     
     def get_header(self, key: str, default=None):
         """Case-insensitive header lookup"""
-        key_lower = key.lower()
-        for k, v in self.headers.items():
-            if k.lower() == key_lower:
-                return v
-        return default
+        key = key.lower()
+        value = self._fields.get(key)
+        if value is None:
+            return default
+        if type(value) is bytes:
+            value = self._fields[key] = value.strip().decode('utf-8', 'replace')
+        return value
     
     async def save_txt_file(self, path):
+        import aiofiles
         self._ensure_directory(path)
         async with aiofiles.open(path, 'w', encoding="utf-8") as file:
             await file.write(str(self))
 
     def _ensure_directory(self, path):
+        from pathlib import Path
         p = Path(path)
 
         # If the path has a suffix, treat it as a file path
@@ -73,24 +123,45 @@ class ParsedMessage:
         return self.get_header('USN')
     
     def get_uuid(self) -> Optional[str]:
+        if self._uuid is not _UNSET:
+            return self._uuid
+        uuid = None
         usn = self.get_usn()
         if usn and usn.startswith('uuid:'):
-            parts = usn[5:].split('::')
-            return parts[0] if parts else None
-        return None
+            uuid = usn[5:].split('::', 1)[0]
+        self._uuid = uuid
+        return uuid
     
     def get_max_wait(self) -> Optional[int]:
+        if self._max_wait is not _UNSET:
+            return self._max_wait
         mx = self.get_header('MX')
-        return int(mx) if mx else None
+        try:
+            self._max_wait = int(mx) if mx else None
+        except ValueError:
+            self._max_wait = None
+        return self._max_wait
     
     def get_cache_control(self) -> Optional[int]:
+        if self._cache_control is not _UNSET:
+            return self._cache_control
+        max_age = None
         cc = self.get_header('CACHE-CONTROL')
         if cc and 'max-age=' in cc:
             try:
-                return int(cc.split('max-age=')[1].split(',')[0].strip())
+                max_age = int(cc.split('max-age=')[1].split(',')[0].strip())
             except (ValueError, IndexError):
-                return None
-        return None
+                pass
+        self._cache_control = max_age
+        return max_age
+    
+    def get_boot_id(self) -> Optional[int]:
+        """BOOTID.UPNP.ORG, which a device increments when it reboots"""
+        boot_id = self.get_header('BOOTID.UPNP.ORG')
+        try:
+            return int(boot_id) if boot_id else None
+        except ValueError:
+            return None
     
     def __str__(self):
         return self.text
@@ -1,12 +1,23 @@
+import asyncio
+import random
 
 from .ssdp_service import SSDPService
 
 class PeriodicAnnouncer:
-    """Sends periodic alive messages"""
+    """Sends periodic alive messages
     
-    def __init__(self, service: SSDPService, interval: int = 600):
+    Each wait is the interval scaled by a random factor within +/- jitter,
+    and the first announcement is delayed by up to `initial_delay`
+    seconds, so servers started together drift apart instead of
+    announcing in lockstep.
+    """
+    
+    def __init__(self, service: SSDPService, interval: int = 600, jitter: float = 0.1,
+                 initial_delay: float = 0.1):
         self.service = service
         self.interval = interval
+        self.jitter = jitter
+        self.initial_delay = initial_delay
         self.task = None
     
     async def start(self):
@@ -25,6 +36,8 @@ class PeriodicAnnouncer:
     
     async def _announce_loop(self):
         """Announce alive periodically"""
+        if self.initial_delay:
+            await asyncio.sleep(random.uniform(0, self.initial_delay))
         while True:
             await self.service.broadcast_alive()
-            await asyncio.sleep(self.interval)
\ No newline at end of file
+            await asyncio.sleep(self.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
@@ -0,0 +1,100 @@
+import asyncio
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .log import get_logger
+
+log = get_logger(__name__)
+
+ADDED = 'added'
+UPDATED = 'updated'
+EXPIRED = 'expired'
+BYEBYE = 'byebye'
+
+Change = Tuple[str, dict]  # (kind, device)
+
+class ChangeFeed:
+    """One subscriber to a DeviceRegistry's changes, delivered in batches
+    
+    Changes are held per uuid and merged until the tick ends, so a device
+    announcing itself many times within a tick costs one entry, and one
+    that is added and gone again within a tick costs nothing. The callback
+    gets the batch as a list of (kind, device) pairs, at most once per
+    `tick` seconds; a coroutine callback runs as a task. With `role`, only
+    devices whose role contains it are reported.
+    """
+    
+    def __init__(self, callback: Callable[[List[Change]], None], tick: float = 1.0,
+                 role: Optional[str] = None):
+        self.callback = callback
+        self.tick = tick
+        self.role = role
+        self.batches = 0
+        self.changes = 0
+        self.is_async = asyncio.iscoroutinefunction(callback)
+        self._pending: Dict[str, Change] = {}
+        self._loop = asyncio.get_running_loop()
+        self._timer: Optional[asyncio.Handle] = None
+        self._closed = False
+    
+    def push(self, kind: str, device: dict):
+        """Record one change, merged with what is pending for the same device"""
+        if self.role is not None and self.role not in (device['role'] or ''):
+            return
+        uuid = device['uuid']
+        previous = self._pending.get(uuid)
+        if previous is not None:
+            previous_kind = previous[0]
+            if previous_kind == ADDED:
+                if kind == UPDATED:
+                    kind = ADDED
+                elif kind in (EXPIRED, BYEBYE):
+                    # Never seen by the subscriber
+                    del self._pending[uuid]
+                    return
+            elif previous_kind in (EXPIRED, BYEBYE) and kind == ADDED:
+                kind = UPDATED
+        self._pending[uuid] = (kind, device)
+        if self._timer is None and not self._closed:
+            self._timer = self._loop.call_later(self.tick, self._flush)
+    
+    def snapshot(self, devices: Iterable[dict]):
+        """Queue every device as added and deliver them without waiting for the tick"""
+        for device in devices:
+            self.push(ADDED, device)
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self._loop.call_soon(self._flush)
+    
+    def close(self):
+        """Stop delivering; pending changes are dropped"""
+        self._closed = True
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self._pending.clear()
+    
+    def _flush(self):
+        self._timer = None
+        if not self._pending:
+            return
+        batch = list(self._pending.values())
+        self._pending = {}
+        self.batches += 1
+        self.changes += len(batch)
+        try:
+            if self.is_async:
+                self._loop.create_task(self._deliver(batch))
+            else:
+                self.callback(batch)
+        except Exception as e:
+            self._report_error(e)
+    
+    async def _deliver(self, batch: List[Change]):
+        try:
+            await self.callback(batch)
+        except Exception as e:
+            self._report_error(e)
+    
+    def _report_error(self, exc: Exception):
+        name = getattr(self.callback, '__qualname__', None) or repr(self.callback)
+        log.warning("subscriber", "Change subscriber %s failed: %s", name, exc)
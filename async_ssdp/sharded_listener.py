@@ -0,0 +1,154 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+from typing import Callable, List, Literal, Optional
+
+from .async_multicast_protocol import MulticastTransport
+from .device_registry import DeviceRegistry
+from .parsed_message import ParsedMessage, ParsedMessageType
+from .ssdp_service import SSDPService
+
+ShardMode = Literal["process", "thread"]
+
+class ShardedListener:
+    """Spread multicast ingest over N workers bound with SO_REUSEPORT
+    
+    Each worker (a process, or a thread with its own event loop) binds the
+    multicast group on the SSDP port with SO_REUSEPORT and runs its own
+    parser and EventBus. Linux hands every multicast datagram to every
+    socket, so each worker keeps the source hosts that hash to its shard
+    and drops the rest before parsing. Unicast to the port (e.g. targeted
+    M-SEARCHes) is taken unsharded by the first worker.
+    
+    Workers send registry updates over one channel in small batches; the
+    parent merges them into a single DeviceRegistry. `setup`, if given, is
+    called with each worker's SSDPService to add subscribers there; in
+    process mode it must be picklable.
+    """
+    
+    def __init__(self, registry: Optional[DeviceRegistry] = None, workers: Optional[int] = None,
+                 mode: ShardMode = "process", multicast_group: str = '239.255.255.250',
+                 multicast_port: int = 1900, setup: Optional[Callable[[SSDPService], None]] = None,
+                 flush_interval: float = 0.05):
+        if mode not in ("process", "thread"):
+            raise ValueError(f"Unknown shard mode: {mode}")
+        self.registry = registry or DeviceRegistry()
+        self.workers = workers or os.cpu_count() or 1
+        self.mode = mode
+        self.multicast_group = multicast_group
+        self.multicast_port = multicast_port
+        self.setup = setup
+        self.flush_interval = flush_interval
+        self.updates = 0
+        self._handles: List = []
+        self._channel = None
+        self._stop = None
+        self._merge_task = None
+        self._merging = False
+    
+    async def start(self):
+        """Start the workers and merge their updates into the registry"""
+        if self._handles:
+            return
+        
+        if self.mode == "process":
+            ctx = multiprocessing.get_context("spawn")
+            self._channel, self._stop = ctx.Queue(), ctx.Event()
+            spawn = ctx.Process
+        else:
+            self._channel, self._stop = queue.Queue(), threading.Event()
+            spawn = threading.Thread
+        
+        for index in range(self.workers):
+            handle = spawn(
+                target=_run_worker,
+                args=(index, self.workers, self.multicast_group, self.multicast_port,
+                      self._channel, self._stop, self.setup, self.flush_interval),
+                daemon=True
+            )
+            handle.start()
+            self._handles.append(handle)
+        
+        self._merging = True
+        self._merge_task = asyncio.create_task(self._merge_loop())
+    
+    async def stop(self):
+        """Stop the workers and apply whatever they flushed last"""
+        if not self._handles:
+            return
+        self._stop.set()
+        loop = asyncio.get_running_loop()
+        for handle in self._handles:
+            await loop.run_in_executor(None, handle.join)
+        self._handles = []
+        
+        # Let the merge loop finish its pending get rather than cancel it:
+        # a batch that get dequeues after a cancel would be lost
+        self._merging = False
+        await self._merge_task
+        self._merge_task = None
+        while True:
+            batch = self._next_batch(0)
+            if batch is None:
+                break
+            self._apply(batch)
+    
+    async def _merge_loop(self):
+        loop = asyncio.get_running_loop()
+        while self._merging:
+            batch = await loop.run_in_executor(None, self._next_batch, 0.2)
+            if batch:
+                self._apply(batch)
+    
+    def _next_batch(self, timeout: float) -> Optional[list]:
+        try:
+            return self._channel.get(timeout=timeout) if timeout else self._channel.get_nowait()
+        except queue.Empty:
+            return None
+    
+    def _apply(self, batch: list):
+        for update in batch:
+            if update[0] == 'byebye':
+                self.registry.remove(update[1])
+            else:
+                self.registry.update(*update[1:])
+        self.updates += len(batch)
+
+
+def _run_worker(index: int, count: int, multicast_group: str, multicast_port: int,
+                channel, stop, setup: Optional[Callable[[SSDPService], None]], flush_interval: float):
+    """Worker entry point; runs in a child process or a thread"""
+    asyncio.run(_worker_main(index, count, multicast_group, multicast_port,
+                             channel, stop, setup, flush_interval))
+
+
+async def _worker_main(index: int, count: int, multicast_group: str, multicast_port: int,
+                       channel, stop, setup: Optional[Callable[[SSDPService], None]], flush_interval: float):
+    transport = MulticastTransport(multicast_group, multicast_port, reuse_port=True, shard=(index, count))
+    service = SSDPService(f"shard{index}", f"shard-{index}", "", transport=transport,
+                          multicast_group=multicast_group, multicast_port=multicast_port)
+    pending = []
+    
+    def forward(message: ParsedMessage, addr):
+        if message.get_notification_type() == 'ssdp:byebye':
+            pending.append(('byebye', message.get_uuid()))
+        elif message.get_location():
+            pending.append(('register', message.get_uuid(), message.get_usn(), message.get_location(),
+                            message.get_role(), message.get_cache_control(), addr))
+    
+    service.subscribe(forward, [ParsedMessageType.NOTIFY, ParsedMessageType.RESPONSE], inline=True)
+    if setup:
+        setup(service)
+    await service.start_listening()
+    try:
+        while not stop.is_set():
+            await asyncio.sleep(flush_interval)
+            if pending:
+                channel.put(pending)
+                pending = []
+    finally:
+        await service.close()
+        if pending:
+            channel.put(pending)
@@ -0,0 +1,153 @@
+import asyncio
+import ipaddress
+import random
+from typing import Callable, Dict, Iterator, Optional, Set, Tuple
+
+from .async_multicast_protocol import BaseTransport
+
+Address = Tuple[str, int]
+
+class SimulatedFabric:
+    """In-process multicast segment for tests and benchmarks
+    
+    Transports created by one fabric see each other's multicast traffic when
+    they share a (group, port), and can unicast to each other's addresses.
+    Separate fabrics are fully isolated, so several segments can run side by
+    side in one process. Endpoint addresses are drawn from `subnet`, moving
+    on to the next port once the hosts run out, so subnet="127.0.0.1/32"
+    gives loopback endpoints with distinct ports. A listening endpoint is
+    also reachable by unicast at its host's multicast port, like a socket
+    bound to the SSDP port, unless another endpoint already listens there.
+    Every delivery can be
+    delayed (latency plus uniform jitter), lost, or duplicated
+    independently per receiver.
+    """
+    
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, loss: float = 0.0,
+                 duplication: float = 0.0, subnet: str = "10.0.0.0/8", base_port: int = 50000,
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.duplication = duplication
+        self.delivered = 0
+        self.lost = 0
+        self.duplicated = 0
+        self._random = random.Random(seed)
+        self._addresses = self._allocate(ipaddress.ip_network(subnet), base_port)
+        self._groups: Dict[Address, Set["SimulatedTransport"]] = {}
+        self._endpoints: Dict[Address, "SimulatedTransport"] = {}
+        self._listening: Dict[Address, "SimulatedTransport"] = {}  # (host, multicast_port) -> listener
+    
+    def create_transport(self, multicast_group: str = '239.255.255.250',
+                         multicast_port: int = 1900) -> "SimulatedTransport":
+        """Attach a new endpoint with its own address to the fabric"""
+        address = next(self._addresses)
+        transport = SimulatedTransport(self, multicast_group, multicast_port, address)
+        self._endpoints[address] = transport
+        return transport
+    
+    def transmit(self, data: bytes, source: Address, destination: Address):
+        """Deliver a datagram to the group members or the unicast endpoint at destination"""
+        members = self._groups.get(destination)
+        if members is not None:
+            receivers = tuple(members)
+        else:
+            endpoint = self._endpoints.get(destination) or self._listening.get(destination)
+            receivers = (endpoint,) if endpoint is not None else ()
+        if not receivers:
+            return
+        
+        loop = asyncio.get_running_loop()
+        if not self.jitter:
+            # Same delay for everyone: one callback fans the datagram out
+            if self.latency:
+                loop.call_later(self.latency, self._fanout, receivers, data, source)
+            else:
+                loop.call_soon(self._fanout, receivers, data, source)
+            return
+        
+        rnd = self._random.random
+        for receiver in receivers:
+            for _ in range(self._copies()):
+                loop.call_later(self.latency + self.jitter * rnd(), receiver._receive, data, source)
+    
+    def _fanout(self, receivers: Tuple["SimulatedTransport", ...], data: bytes, source: Address):
+        for receiver in receivers:
+            for _ in range(self._copies()):
+                receiver._receive(data, source)
+    
+    def _copies(self) -> int:
+        """How many copies one receiver gets: 0 when lost, 2 when duplicated"""
+        if self.loss and self._random.random() < self.loss:
+            self.lost += 1
+            return 0
+        if self.duplication and self._random.random() < self.duplication:
+            self.duplicated += 1
+            self.delivered += 2
+            return 2
+        self.delivered += 1
+        return 1
+    
+    @staticmethod
+    def _allocate(network: ipaddress.IPv4Network, port: int) -> Iterator[Address]:
+        while True:
+            for host in network.hosts():
+                yield (str(host), port)
+            port += 1
+    
+    def _join(self, transport: "SimulatedTransport"):
+        self._groups.setdefault((transport.multicast_group, transport.multicast_port), set()).add(transport)
+        self._listening.setdefault((transport.address[0], transport.multicast_port), transport)
+    
+    def _leave(self, transport: "SimulatedTransport"):
+        members = self._groups.get((transport.multicast_group, transport.multicast_port))
+        if members is not None:
+            members.discard(transport)
+        port = (transport.address[0], transport.multicast_port)
+        if self._listening.get(port) is transport:
+            del self._listening[port]
+    
+    def _detach(self, transport: "SimulatedTransport"):
+        self._leave(transport)
+        self._endpoints.pop(transport.address, None)
+
+
+class SimulatedTransport(BaseTransport):
+    """Transport backed by a SimulatedFabric instead of sockets"""
+    
+    def __init__(self, fabric: SimulatedFabric, multicast_group: str, multicast_port: int,
+                 address: Address):
+        super().__init__(multicast_group, multicast_port)
+        self.fabric = fabric
+        self.address = address
+        self._on_datagram: Optional[Callable[[bytes, Address], None]] = None
+    
+    async def start_listener(self, on_datagram: Callable[[bytes, Address], None]):
+        """Join the fabric's multicast group"""
+        self._on_datagram = on_datagram
+        self.fabric._join(self)
+    
+    def stop_listener(self):
+        """Leave the multicast group"""
+        self.fabric._leave(self)
+        self._on_datagram = None
+    
+    async def start_sender(self):
+        pass
+    
+    def close(self):
+        """Leave the fabric altogether"""
+        self.stop_listener()
+        self.fabric._detach(self)
+    
+    def _ready(self) -> bool:
+        return True
+    
+    def _sendto(self, data: bytes, addr: Address) -> bool:
+        self.fabric.transmit(data, self.address, addr)
+        return False
+    
+    def _receive(self, data: bytes, source: Address):
+        if self._on_datagram:
+            self._on_datagram(data, source)
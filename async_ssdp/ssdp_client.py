@@ -1,32 +1,262 @@
 import asyncio
+import time
 import uuid
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Set
 
 from .ssdp_service import SSDPService
+from .continuous_discovery import ContinuousDiscovery
 from .device_registry import DeviceRegistry
 from .parsed_message import ParsedMessage, ParsedMessageType
 
+if TYPE_CHECKING:
+    from .description_fetcher import DescriptionFetcher
+
 class SSDPClient:
-    """Client that discovers and tracks devices"""
+    """Client that discovers and tracks devices
+    
+    compact_registry=True stores the registry compactly, for segments with
+    very many devices (see DeviceRegistry); other kwargs go to SSDPService.
+    """
     
-    def __init__(self, **kwargs):
+    RETRANSMIT_INTERVAL = 0.25
+    
+    def __init__(self, compact_registry: bool = False, **kwargs):
         self.service = SSDPService(**kwargs)
-        self.registry = DeviceRegistry()
+        self.registry = DeviceRegistry(metrics=self.service.metrics, compact=compact_registry)
+        self._subscribed = False
+        self._listeners: Set[asyncio.Queue] = set()
+        self._response_listeners: Set[asyncio.Queue] = set()  # only fed by M-SEARCH responses
+        self._verify_task: Optional[asyncio.Task] = None
+        self.fetcher: Optional['DescriptionFetcher'] = None
+        self._describing: Dict[str, asyncio.Task] = {}  # uuid -> pending fetch
+        self.continuous: Optional[ContinuousDiscovery] = None
     
-    async def discover(self, target: str = "ssdp:all", timeout: int = 5):
-        """Actively search for devices"""
-        await self.service.start_listening()
+    async def discover(self, target: str = "ssdp:all", timeout: int = 5,
+                       max_devices: Optional[int] = None, usn: Optional[str] = None,
+                       role: Optional[str] = None):
+        """Actively search for devices
+        
+        Returns the whole registry once the search window closes, or as soon
+        as max_devices (or the device matching usn/role) has answered.
+        """
+        async for _ in self.discover_iter(target, timeout, max_devices, usn, role):
+            pass
+        return self.registry.get_all_devices()
+    
+    async def discover_iter(self, target: str = "ssdp:all", timeout: int = 5,
+                            max_devices: Optional[int] = None, usn: Optional[str] = None,
+                            role: Optional[str] = None, searches: int = 1,
+                            retransmit: int = 2) -> AsyncIterator[dict]:
+        """Search for devices, yielding each one as soon as it is first seen
         
-        # Subscribe to responses
-        self.service.subscribe(self._on_discovery, [ParsedMessageType.RESPONSE, ParsedMessageType.NOTIFY])
+        Each of `searches` rounds sends the M-SEARCH `retransmit` times, as
+        UDA recommends for UDP, and lasts timeout + 1 seconds. Unless target
+        is ssdp:all, only devices it matches (by NT/ST, USN or uuid) are
+        yielded, so unrelated announcements heard meanwhile don't count
+        towards max_devices. With usn or role set, only matching devices
+        (role as a substring) are yielded, and the search stops at the
+        first match unless max_devices says otherwise. All rounds share
+        the client's single subscription.
+        """
+        if max_devices is None and (usn or role):
+            max_devices = 1
         
-        # Send search
-        await self.service.broadcast_msearch(target, mx=timeout)
+        await self._ensure_subscribed()
+        queue: asyncio.Queue = asyncio.Queue()
+        self._listeners.add(queue)
+        sender = asyncio.create_task(self._search_rounds(target, timeout, searches, retransmit))
         
-        # Wait for responses
+        seen = set()
+        deadline = time.monotonic() + searches * (timeout + 1)
+        try:
+            while max_devices is None or len(seen) < max_devices:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    device = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if device['uuid'] in seen or not self._matches_target(device, target):
+                    continue
+                if usn and device['usn'] != usn:
+                    continue
+                if role and role not in (device['role'] or ''):
+                    continue
+                seen.add(device['uuid'])
+                yield device
+        finally:
+            self._listeners.discard(queue)
+            sender.cancel()
+    
+    async def warm_start(self, path: str, verify_within: float = 300.0, timeout: int = 2) -> int:
+        """Load a registry snapshot and re-verify the devices about to expire
+        
+        Returns the number of devices restored. Verification runs in the
+        background (see verify); everything else is trusted until its
+        max-age runs out or the next NOTIFY refreshes it.
+        """
+        restored = await self.registry.load(path)
+        if restored and verify_within > 0:
+            await self._ensure_subscribed()
+            self._verify_task = asyncio.create_task(self.verify(verify_within, timeout))
+        return restored
+    
+    async def verify(self, within: float = 300.0, timeout: int = 2) -> List[str]:
+        """Re-check devices expiring within `within` seconds with targeted searches
+        
+        Each device gets an M-SEARCH for ST uuid:<uuid>, unicast to the SSDP
+        port of the host it was last seen on. Answers refresh the registry
+        as usual; the uuids that did not answer within timeout + 1 seconds
+        are returned and left to expire.
+        """
+        devices = self.registry.get_expiring(within)
+        if not devices:
+            return []
+        await self._ensure_subscribed()
+        await self._search_devices(devices, timeout)
         await asyncio.sleep(timeout + 1)
+        # An answer moves the expiry time; an entry still expiring when it did never answered
+        unanswered = []
+        for device in devices:
+            current = self.registry.get_device(device['uuid'])
+            if current is not None and current['expires_at'] == device['expires_at']:
+                unanswered.append(device['uuid'])
+        return unanswered
+    
+    async def start_continuous(self, **kwargs) -> ContinuousDiscovery:
+        """Keep discovering in the background, adapting to the segment
         
-        return self.registry.get_all_devices()
+        kwargs configure the ContinuousDiscovery; its counters, including
+        packets sent per device discovered, are exposed as metrics.
+        """
+        if self.continuous is None:
+            self.continuous = ContinuousDiscovery(self, **kwargs)
+            self.service.metrics.add_collector('discovery', self.continuous.as_dict)
+            await self.continuous.start()
+        return self.continuous
+    
+    async def stop_continuous(self):
+        if self.continuous is not None:
+            await self.continuous.stop()
+            self.service.metrics.remove_collector('discovery')
+            self.continuous = None
+    
+    async def start_describing(self, fetcher: Optional['DescriptionFetcher'] = None, **kwargs) -> 'DescriptionFetcher':
+        """Fetch the description of every device as it is discovered
+        
+        Descriptions end up under 'description' in the registry entries.
+        kwargs configure the DescriptionFetcher when none is given.
+        """
+        if self.fetcher is None:
+            if fetcher is None:
+                # Pulls in ssl and xml, so only once descriptions are wanted
+                from .description_fetcher import DescriptionFetcher
+                fetcher = DescriptionFetcher(**kwargs)
+            self.fetcher = fetcher
+            self.service.metrics.add_collector('descriptions', self.fetcher.as_dict)
+            for device in self.registry.get_all_devices():
+                self._schedule_describe(device, None, None)
+        await self._ensure_subscribed()
+        return self.fetcher
+    
+    async def stop_describing(self):
+        """Stop fetching descriptions and close the fetcher's connections"""
+        for task in self._describing.values():
+            task.cancel()
+        self._describing.clear()
+        if self.fetcher is not None:
+            self.service.metrics.remove_collector('descriptions')
+            await self.fetcher.close()
+            self.fetcher = None
+    
+    async def describe(self, device: dict) -> Optional[dict]:
+        """Fetch (or take from cache) one device's description and store it in the registry"""
+        if self.fetcher is None:
+            raise RuntimeError("start_describing() has not been called")
+        description = await self.fetcher.fetch(device['location'])
+        if description is not None:
+            self.registry.set_description(device['uuid'], device['location'], description)
+        return description
+    
+    async def close(self):
+        """Drop the discovery subscription and close the service"""
+        if self._verify_task:
+            self._verify_task.cancel()
+            self._verify_task = None
+        await self.stop_continuous()
+        await self.stop_describing()
+        if self._subscribed:
+            self.service.unsubscribe(self._on_discovery)
+            self._subscribed = False
+        await self.service.close()
+    
+    async def _ensure_subscribed(self):
+        await self.service.start_listening()
+        if not self._subscribed:
+            self.service.subscribe(self._on_discovery, [ParsedMessageType.RESPONSE, ParsedMessageType.NOTIFY], inline=True)
+            self._subscribed = True
+    
+    async def _search_devices(self, devices: List[dict], mx: int) -> int:
+        """Unicast an M-SEARCH for uuid:<uuid> to each device's host; returns the packets sent"""
+        port = self.service.transport.multicast_port
+        builder = self.service.message_builder
+        batch = []
+        for device in devices:
+            message = builder.build_msearch_request(f"uuid:{device['uuid']}", mx)
+            batch.append((message, (device['addr'][0], port)) if device['addr'] else message)
+        result = await self.service.send_many(batch, pacing=0.001, burst=16)
+        return result.sent
+    
+    async def _search_rounds(self, target: str, timeout: int, searches: int, retransmit: int):
+        for _ in range(searches):
+            started = time.monotonic()
+            for i in range(max(retransmit, 1)):
+                if i:
+                    await asyncio.sleep(self.RETRANSMIT_INTERVAL)
+                await self.service.broadcast_msearch(target, mx=timeout)
+            await asyncio.sleep(max(0.0, started + timeout + 1 - time.monotonic()))
+    
+    @staticmethod
+    def _matches_target(device: dict, target: str) -> bool:
+        """Whether a device would answer an M-SEARCH for target"""
+        if target == "ssdp:all" or target == device['role']:
+            return True
+        if target == f"uuid:{device['uuid']}":
+            return True
+        device_usn = device['usn'] or ''
+        return device_usn == target or device_usn.endswith(f"::{target}")
+    
+    def _on_discovery(self, message: ParsedMessage, addr):
+        if message.get_notification_type() == 'ssdp:byebye':
+            self.registry.remove(message.get_uuid())
+        elif message.get_location():
+            device = self.registry.register(message, addr)
+            if device is not None:
+                if self.fetcher is not None:
+                    self._schedule_describe(device, message.get_cache_control(), message.get_boot_id())
+                for queue in self._listeners:
+                    queue.put_nowait(device)
+                if message.message_type == ParsedMessageType.RESPONSE:
+                    for queue in self._response_listeners:
+                        queue.put_nowait(device)
+    
+    def _schedule_describe(self, device: dict, max_age: Optional[int], boot_id: Optional[int]):
+        location = device['location']
+        if not location or device['uuid'] in self._describing:
+            return
+        description = self.fetcher.cached(location, boot_id)
+        if description is not None:
+            self.registry.set_description(device['uuid'], location, description)
+            return
+        task = asyncio.create_task(self._describe(device['uuid'], location, max_age, boot_id))
+        self._describing[device['uuid']] = task
     
-    async def _on_discovery(self, message: ParsedMessage, addr):
-        if message.get_location():
-            self.registry.register(message, addr)
\ No newline at end of file
+    async def _describe(self, uuid: str, location: str, max_age: Optional[int], boot_id: Optional[int]):
+        try:
+            description = await self.fetcher.fetch(location, max_age, boot_id)
+            if description is not None:
+                self.registry.set_description(uuid, location, description)
+        finally:
+            if self._describing.get(uuid) is asyncio.current_task():
+                del self._describing[uuid]
@@ -1,22 +1,140 @@
 import asyncio
+import heapq
 import random
-from typing import List
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .log import get_logger
+from .message_builder import MessageBuilder
 from .ssdp_service import SSDPService
 from .parsed_message import ParsedMessage
 
+log = get_logger(__name__)
+
+Address = Tuple[str, int]
+
 class SSDPResponder:
-    """Automatically responds to M-SEARCH requests"""
+    """Automatically responds to M-SEARCH requests
+    
+    Responses are unicast back to the searcher after a random delay within
+    MX (capped at 5 seconds, as UDA requires). Repeats of the same
+    (requester, ST) pair while a reply is pending are merged into that
+    reply. All pending replies share one heap and one loop timer. Each
+    source host is limited by a token bucket of `rate` replies per second,
+    with bursts up to `burst`. Subclasses answering for other identities
+    override _builders_for and _send.
+    """
+    
+    MAX_MX = 5
+    MAX_SOURCES = 4096
     
-    def __init__(self, service: SSDPService, match_targets: List[str]):
+    def __init__(self, service: SSDPService, match_targets: Iterable[str],
+                 rate: float = 10.0, burst: int = 20):
         self.service = service
-        self.match_targets = match_targets  # e.g., ["ssdp:all", "upnp:rootdevice", "urn:schemas-upnp-org:device:miner:1"]
+        self.match_targets = set(match_targets)  # e.g., {"ssdp:all", "upnp:rootdevice", "urn:schemas-upnp-org:device:miner:1"}
+        self.rate = rate
+        self.burst = burst
+        self.scheduled = 0
+        self.coalesced = 0
+        self.rate_limited = 0
+        self._pending: Dict[Tuple[Address, str], float] = {}
+        self._due: List[Tuple[float, Address, str]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at = 0.0
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # host -> (tokens, updated)
+        self._sends: Set[asyncio.Task] = set()
+    
+    async def handle_search(self, message: ParsedMessage, addr: Address):
+        # Nothing to await, but a coroutine always runs on the loop however it is subscribed
+        if not message.is_search():
+            return
+        target = message.get_search_target()
+        if not self._matches(target):
+            return
+        
+        key = (addr, target)
+        if key in self._pending:
+            self.coalesced += 1
+            return
+        if not self._allow(addr[0]):
+            self.rate_limited += 1
+            return
+        
+        # Respect MX (random delay)
+        mx = min(message.get_max_wait() or 3, self.MAX_MX)
+        loop = asyncio.get_running_loop()
+        delay = random.uniform(0, mx)
+        due = loop.time() + delay
+        self._pending[key] = due
+        heapq.heappush(self._due, (due, addr, target))
+        self.scheduled += 1
+        if self.service.metrics.enabled:
+            self.service.metrics.responder_delay.observe(delay)
+        
+        if self._timer is None or due < self._timer_at:
+            self._arm(loop, due)
+    
+    def close(self):
+        """Cancel all pending responses"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self._pending.clear()
+        self._due.clear()
+    
+    def _arm(self, loop: asyncio.AbstractEventLoop, when: float):
+        if self._timer:
+            self._timer.cancel()
+        self._timer = loop.call_at(when, self._flush)
+        self._timer_at = when
+    
+    def _flush(self):
+        """Send every response that has come due"""
+        self._timer = None
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        
+        responses = {}
+        batch = []
+        while self._due and self._due[0][0] <= now:
+            _, addr, target = heapq.heappop(self._due)
+            del self._pending[(addr, target)]
+            if target not in responses:
+                responses[target] = [b.build_msearch_response(target) for b in self._builders_for(target)]
+            batch.extend((response, addr) for response in responses[target])
+        
+        if batch:
+            task = loop.create_task(self._send(batch))
+            self._sends.add(task)
+            task.add_done_callback(self._sent)
+        if self._due:
+            self._arm(loop, self._due[0][0])
+    
+    def _sent(self, task: asyncio.Task):
+        self._sends.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.warning("send", "Failed to send M-SEARCH responses: %s", task.exception())
+    
+    def _matches(self, target: Optional[str]) -> bool:
+        return target == "ssdp:all" or target in self.match_targets
+    
+    def _builders_for(self, target: str) -> List[MessageBuilder]:
+        """The identities that answer a search for target"""
+        return [self.service.message_builder]
+    
+    async def _send(self, batch: List[Tuple[bytes, Address]]):
+        await self.service.send_many(batch)
+    
+    def _allow(self, host: str) -> bool:
+        """Token-bucket check for one reply to host"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(host, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        allowed = tokens >= 1
+        self._buckets[host] = (tokens - 1 if allowed else tokens, now)
         
-    async def handle_search(self, message: ParsedMessage, addr):
-        if message.is_search():
-            target = message.get_search_target()
-            if target in self.match_targets or "ssdp:all" in [target]:
-                # Respect MX (random delay)
-                mx = message.get_max_wait() or 3
-                delay = random.uniform(0, mx)
-                await asyncio.sleep(delay)
-                await self.service.broadcast_msearch_response(target)
\ No newline at end of file
+        if len(self._buckets) > self.MAX_SOURCES:
+            # Hosts idle long enough to refill completely are the same as unseen ones
+            idle = self.burst / self.rate
+            self._buckets = {h: b for h, b in self._buckets.items() if now - b[1] < idle}
+        return allowed
@@ -10,7 +10,8 @@ class SSDPServer:
     def __init__(self, device: str, uuid: str, location: str, **kwargs):
         self.service = SSDPService(device, uuid, location, **kwargs)
         self.announcer = PeriodicAnnouncer(self.service)
-        self.responder = SSDPResponder(self.service, ["ssdp:all", f"urn:schemas-upnp-org:device:{device}:1"])
+        self.responder = SSDPResponder(self.service, ["ssdp:all", f"urn:schemas-upnp-org:device:{device}:1",
+                                                      f"uuid:{uuid}"])
     
     async def start(self):
         await self.service.start_listening()
@@ -18,5 +19,6 @@ class SSDPServer:
         await self.announcer.start()
     
     async def stop(self):
+        self.responder.close()
         await self.announcer.stop()
-        await self.service.stop_listening()
\ No newline at end of file
+        await self.service.close()
\ No newline at end of file
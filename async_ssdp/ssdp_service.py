@@ -1,14 +1,29 @@
 import asyncio
+import time
 from .message_builder import MessageBuilder
-from .async_multicast_protocol import MulticastTransport
+from .async_multicast_protocol import BaseTransport, BatchResult, MulticastTransport
+from .capture import CaptureWriter
+from .duplicate_filter import DuplicateFilter
 from .event_bus import EventBus
+from .ingest_queue import IngestQueue, OverflowPolicy
+from .log import get_logger
+from .message_filter import MessageFilter
 from .message_parser import MessageParser, MessageSubType
+from .metrics import Metrics
 from .parsed_message import ParsedMessageType
 
-from typing import List, Callable, Tuple
+from typing import Iterable, List, Callable, Optional, Tuple
+
+log = get_logger(__name__)
 
 class SSDPService:
-    """High-level SSDP service orchestrator"""
+    """High-level SSDP service orchestrator
+    
+    `metrics` defaults to a disabled Metrics; pass Metrics() or set
+    service.metrics.enabled to start recording. Repeats of a datagram from
+    the same source within `duplicate_window` seconds are dropped before
+    parsing (0 disables this).
+    """
     
     def __init__(self, 
                  device: str,
@@ -17,7 +32,14 @@ class SSDPService:
                  cache: int = 1800,
                  json_upnp: bool = False,
                  multicast_group: str = '239.255.255.250',
-                 multicast_port: int = 1900):
+                 multicast_port: int = 1900,
+                 ingest_queue_size: int = 1024,
+                 ingest_workers: int = 4,
+                 overflow_policy: OverflowPolicy = "drop_oldest",
+                 transport: Optional[BaseTransport] = None,
+                 metrics: Optional[Metrics] = None,
+                 duplicate_window: float = 1.0,
+                 duplicate_cache_size: int = 4096):
         
         schema = "urn:schemas-json-upnp-org" if json_upnp else "urn:schemas-upnp-org"
         
@@ -25,54 +47,164 @@ class SSDPService:
             device, uuid, location, schema, 
             multicast_group, multicast_port, cache
         )
-        self.transport = MulticastTransport(multicast_group, multicast_port)
-        self.event_bus = EventBus()
+        self.transport = transport or MulticastTransport(multicast_group, multicast_port)
+        self.metrics = metrics or Metrics(enabled=False)
+        self.event_bus = EventBus(metrics=self.metrics)
         self.parser = MessageParser()
+        self.ingest = IngestQueue(ingest_queue_size, overflow_policy)
+        self.metrics.add_collector('ingest', self.ingest.as_dict)
+        self.metrics.add_collector('transport', self.transport.stats.as_dict)
+        self.capture: Optional[CaptureWriter] = None
+        self.duplicates: Optional[DuplicateFilter] = None
+        if duplicate_window > 0:
+            self.duplicates = DuplicateFilter(duplicate_window, duplicate_cache_size)
+            self.metrics.add_collector('duplicates', self.duplicates.as_dict)
+        self.ingest_workers = ingest_workers
+        self._workers: List[asyncio.Task] = []
         self._is_listening = False
     
     async def broadcast_alive(self, status: MessageSubType=None):
         """Broadcast an 'alive' notification"""
         message = self.message_builder.build_notify('alive', status)
-        await self.transport.send(message)
+        await self._send(message)
     
     async def broadcast_byebye(self):
         """Broadcast a 'byebye' notification"""
         message = self.message_builder.build_notify('byebye')
-        await self.transport.send(message)
+        await self._send(message)
+    
+    async def broadcast_alive_many(self, builders: Iterable[MessageBuilder] = None,
+                                   status: MessageSubType = None, repeat: int = 1,
+                                   pacing: float = 0.0) -> BatchResult:
+        """Broadcast 'alive' for several services in one batch"""
+        messages = [b.build_notify('alive', status) for b in builders or [self.message_builder]]
+        return await self.send_many(messages * repeat, pacing=pacing)
+    
+    async def broadcast_byebye_many(self, builders: Iterable[MessageBuilder] = None,
+                                    repeat: int = 1, pacing: float = 0.0) -> BatchResult:
+        """Broadcast 'byebye' for several services in one batch"""
+        messages = [b.build_notify('byebye') for b in builders or [self.message_builder]]
+        return await self.send_many(messages * repeat, pacing=pacing)
+    
+    async def send_many(self, messages: Iterable, pacing: float = 0.0, burst: int = 1) -> BatchResult:
+        """Send pre-built messages in one batch, see MulticastTransport.send_many"""
+        result = await self.transport.send_many(messages, pacing=pacing, burst=burst)
+        if self.metrics.enabled:
+            self.metrics.datagrams_sent += result.sent
+        return result
     
     async def broadcast_msearch(self, target: str, mx: int = 5):
         """Broadcast an M-SEARCH request"""
         message = self.message_builder.build_msearch_request(target, mx)
-        await self.transport.send(message)
+        await self._send(message)
     
     async def broadcast_msearch_response(self, target: str):
         """Broadcast an M-SEARCH response"""
         message = self.message_builder.build_msearch_response(target)
-        await self.transport.send(message)
+        await self._send(message)
+    
+    async def send_msearch_response(self, target: str, addr: Tuple[str, int]):
+        """Unicast an M-SEARCH response to the searcher"""
+        message = self.message_builder.build_msearch_response(target)
+        await self._send(message, addr)
     
     async def start_listening(self):
         """Start listening for multicast messages"""
         if self._is_listening:
             return
         
+        self._workers = [asyncio.create_task(self._ingest_worker()) for _ in range(self.ingest_workers)]
         await self.transport.start_listener(self._on_datagram)
         self._is_listening = True
     
     async def stop_listening(self):
         """Stop listening for multicast messages"""
         self.transport.stop_listener()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
         self._is_listening = False
     
+    async def close(self):
+        """Stop listening and release the sender socket"""
+        await self.stop_listening()
+        await self.stop_capture()
+        self.transport.close()
+    
+    async def start_capture(self, path: str, **kwargs) -> CaptureWriter:
+        """Record every received datagram to a capture log, see CaptureWriter"""
+        if self.capture is None:
+            capture = CaptureWriter(path, **kwargs)
+            await capture.open()
+            self.capture = capture
+            self.metrics.add_collector('capture', capture.as_dict)
+        return self.capture
+    
+    async def stop_capture(self):
+        """Stop recording and flush the capture log"""
+        if self.capture is not None:
+            capture, self.capture = self.capture, None
+            self.metrics.remove_collector('capture')
+            await capture.close()
+    
+    async def dispatch(self, data: bytes, addr: Tuple[str, int]):
+        """Parse one datagram and publish it on the event bus"""
+        metrics = self.metrics
+        if metrics.enabled:
+            started = time.perf_counter()
+            message = self.parser.parse(data, metrics)
+            metrics.parse_time.observe(time.perf_counter() - started)
+            if message:
+                metrics.messages[message.message_type] += 1
+        else:
+            message = self.parser.parse(data)
+        if message:
+            await self.event_bus.publish(message, addr)
+    
+    async def _send(self, message, addr: Optional[Tuple[str, int]] = None):
+        await self.transport.send(message, addr)
+        if self.metrics.enabled:
+            self.metrics.datagrams_sent += 1
+    
     def _on_datagram(self, data: bytes, addr: Tuple[str, int]):
         """Handle received datagram"""
-        message = self.parser.parse(data)
-        if message:
-            # Schedule async publish
-            asyncio.create_task(self.event_bus.publish(message, addr))
+        if self.metrics.enabled:
+            self.metrics.datagrams_received += 1
+        if self.capture is not None:
+            self.capture.write(data, addr)
+        if self.duplicates is not None and self.duplicates.is_duplicate(data, addr):
+            return
+        matcher = self.event_bus.matcher
+        if matcher is not None and not matcher.matches(data, addr):
+            # No subscriber wants it: don't even parse it
+            if self.metrics.enabled:
+                self.metrics.datagrams_filtered += 1
+            return
+        # Parsing happens in the workers, so overflow is shed before any work is done
+        self.ingest.put_nowait(data, addr)
     
-    def subscribe(self, callback: Callable, message_types: List[ParsedMessageType] = None):
-        """Subscribe to SSDP messages"""
-        self.event_bus.subscribe(callback, message_types)
+    async def _ingest_worker(self):
+        """Parse queued datagrams and publish them on the event bus"""
+        while True:
+            received_at = None
+            try:
+                data, addr, received_at = await self.ingest.get()
+                await self.dispatch(data, addr)
+            except Exception as e:
+                log.warning("dispatch", "Error dispatching message: %s", e)
+            if received_at is not None:
+                self.ingest.task_done(received_at)
+    
+    def subscribe(self, callback: Callable, message_types: List[ParsedMessageType] = None,
+                  inline: bool = False, timeout: Optional[float] = None,
+                  filter: Optional[MessageFilter] = None):
+        """Subscribe to SSDP messages, see EventBus.subscribe
+        
+        Datagrams that no subscriber's types and filter can match are
+        dropped before parsing.
+        """
+        self.event_bus.subscribe(callback, message_types, inline, timeout, filter)
     
     def unsubscribe(self, callback: Callable):
         """Unsubscribe from SSDP messages"""
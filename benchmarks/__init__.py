@@ -0,0 +1,6 @@
+"""Benchmarks for async_ssdp
+
+Run one module with ``python -m benchmarks.<name>``, or the whole suite with
+``python -m benchmarks [--quick] [--output results.json]``. Every benchmark
+prints JSON so results can be stored and compared between runs.
+"""
@@ -0,0 +1,70 @@
+"""Run every benchmark and print one JSON document with run metadata"""
+
+import argparse
+import datetime
+import json
+import platform
+import sys
+from importlib import metadata
+
+from . import builder, event_bus, loopback, memory, parser, registry, startup, transport
+
+# name -> (module, full-size arguments, --quick arguments)
+SUITE = {
+    'parser': (parser, {}, {'count': 10000, 'repeat': 2}),
+    'builder': (builder, {}, {'count': 5000, 'repeat': 2}),
+    'event_bus': (event_bus, {}, {'count': 2000}),
+    'registry': (registry, {}, {'devices': 2000, 'count': 10000}),
+    'memory': (memory, {}, {'devices': 2000, 'count': 4000}),
+    'transport': (transport, {}, {'count': 500}),
+    'loopback': (loopback, {}, {'count': 2000}),
+    'startup': (startup, {}, {'count': 5}),
+}
+
+
+def _version() -> str:
+    try:
+        return metadata.version("async_ssdp")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def run(names=None, quick: bool = False) -> dict:
+    results = {}
+    for name in names or SUITE:
+        module, full, small = SUITE[name]
+        results[name] = module.run(**(small if quick else full))
+    return {
+        'meta': {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'package_version': _version(),
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__)
+    cli.add_argument("names", nargs="*", metavar="name",
+                      help=f"benchmarks to run (default: all of {', '.join(SUITE)})")
+    cli.add_argument("--quick", action="store_true", help="small sizes, for a smoke run")
+    cli.add_argument("--output", help="also write the JSON to this file")
+    args = cli.parse_args()
+    unknown = [name for name in args.names if name not in SUITE]
+    if unknown:
+        cli.error(f"unknown benchmark: {', '.join(unknown)}")
+    
+    document = json.dumps(run(args.names, args.quick), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    print(document)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Builder benchmark: pre-encoded MessageBuilder templates vs. the original f-string builder"""
+import argparse
+import json
+import platform
+from email.utils import formatdate
+from typing import List
+
+from async_ssdp import MessageBuilder
+
+from .common import best_time, rate
+
+ARGS = ("bench", "4d696e69-444c-164e-9d41-b827eb000001", "http://192.168.1.20:8080/description.xml",
+        "urn:schemas-upnp-org", "239.255.255.250", 1900)
+
+
+class _LegacyBuilder:
+    """The original MessageBuilder, plus the utf-8 encode the transport used to do"""
+    
+    def __init__(self, device: str, uuid: str, location: str, schema: str,
+                 multicast_group: str, multicast_port: int, cache: int = 1800):
+        self.device = device
+        self.uuid = uuid
+        self.location = location
+        self.schema = schema
+        self.multicast_group = multicast_group
+        self.multicast_port = multicast_port
+        self.cache = cache
+        self.json_upnp = "json" in schema
+    
+    def build_notify(self, type: str, sub_type: str = None) -> bytes:
+        os_name = platform.system()
+        os_release = platform.version()
+        server_upnp = "json-UPnP/1.0" if self.json_upnp else "UPnp/1.0"
+        nts = f"{type}" if not sub_type else f"{type}::{sub_type}"
+        args = [
+            "NOTIFY * HTTP/1.0",
+            f"HOST: {self.multicast_group}:{self.multicast_port}",
+            f"NT: urn:{self.schema}:{self.device}:1",
+            f"NTS: ssdp:{nts}",
+            f"LOCATION: {self.location}",
+            f"USN: uuid:{self.uuid}::{self.schema}:{self.device}:1",
+            f"CACHE-CONTROL: max-age={self.cache}",
+            f"SERVER: {os_name}/{os_release} {server_upnp} {self.device}/1.0"
+        ]
+        return self._build_message(args).encode("utf-8")
+    
+    def build_msearch_request(self, target: str, mx: int = 5) -> bytes:
+        args = [
+            "M-SEARCH * HTTP/1.1",
+            f"HOST: {self.multicast_group}:{self.multicast_port}",
+            f"MAN: \"ssdp:discover\"",
+            f"MX: {mx}",
+            f"ST: {target}"
+        ]
+        return self._build_message(args).encode("utf-8")
+    
+    def build_msearch_response(self, target: str) -> bytes:
+        os_name = platform.system()
+        os_release = platform.version()
+        server_upnp = "json-UPnP/1.0" if self.json_upnp else "UPnp/1.0"
+        args = [
+            "HTTP/1.1 200 OK",
+            f"CACHE-CONTROL: max-age={self.cache}",
+            f"DATE: {formatdate(usegmt=True)}",
+            f"EXT: ",
+            f"LOCATION: {self.location}",
+            f"SERVER: {os_name}/{os_release} {server_upnp} {self.device}/1.0",
+            f"ST: ssdp:{target}",
+            f"USN: uuid:{self.uuid}::{self.schema}:device:{self.device}",
+        ]
+        return self._build_message(args).encode("utf-8")
+    
+    @staticmethod
+    def _build_message(args: List[str]) -> str:
+        return "\r\n".join(args) + "\r\n\r\n"
+
+
+def _rate(fn, count: int, repeat: int) -> dict:
+    return rate(best_time(lambda _: fn(), (None,), count, repeat), count)
+
+
+def run(count: int = 50000, repeat: int = 5) -> dict:
+    results = {'count': count, 'repeat': repeat}
+    for name, builder in [('legacy', _LegacyBuilder(*ARGS)), ('current', MessageBuilder(*ARGS))]:
+        results[name] = {
+            'notify': _rate(lambda: builder.build_notify('alive'), count, repeat),
+            'msearch_request': _rate(lambda: builder.build_msearch_request('ssdp:all', 3), count, repeat),
+            'msearch_response': _rate(lambda: builder.build_msearch_response('upnp:rootdevice'), count, repeat),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.count, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Timing and reporting helpers shared by the benchmark modules"""
+import time
+from typing import Callable, Dict, List, Sequence
+
+
+def best_time(fn: Callable, inputs: Sequence, count: int, repeat: int) -> float:
+    """Best wall time of `repeat` runs calling fn over `count` inputs (cycled)"""
+    best = None
+    size = len(inputs)
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for i in range(count):
+            fn(inputs[i % size])
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def rate(elapsed: float, count: int) -> Dict[str, float]:
+    return {'seconds': elapsed, 'per_second': count / elapsed, 'ns_per_op': elapsed / count * 1e9}
+
+
+def percentiles(samples: List[float], points: Sequence[float] = (50, 90, 99, 99.9)) -> Dict[str, float]:
+    """Nearest-rank percentiles plus min/max/mean of a list of samples"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    result = {'min': ordered[0], 'max': ordered[-1], 'mean': sum(ordered) / len(ordered)}
+    for point in points:
+        index = min(len(ordered) - 1, max(0, int(round(point / 100 * len(ordered))) - 1))
+        result[f"p{point:g}"] = ordered[index]
+    return result
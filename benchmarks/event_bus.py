@@ -0,0 +1,69 @@
+"""EventBus benchmark: publish cost for inline, async and executor subscribers"""
+import argparse
+import asyncio
+import json
+import time
+
+from async_ssdp import EventBus, MessageParser, ParsedMessageType
+
+from .common import percentiles, rate
+from .traffic import TrafficGenerator
+
+
+async def _publish_all(bus: EventBus, messages: list, count: int) -> dict:
+    size = len(messages)
+    latencies = []
+    started = time.perf_counter()
+    for i in range(count):
+        message, addr = messages[i % size]
+        t0 = time.perf_counter()
+        await bus.publish(message, addr)
+        latencies.append(time.perf_counter() - t0)
+    result = rate(time.perf_counter() - started, count)
+    result['latency'] = percentiles(latencies)
+    return result
+
+
+async def _run(count: int, subscribers: int) -> dict:
+    messages = []
+    for data, addr in TrafficGenerator(seed=5, malformed=0).datagrams(1000):
+        message = MessageParser.parse(data)
+        messages.append((message, addr))
+    
+    def sync_callback(message, addr):
+        message.get_uuid()
+    
+    async def async_callback(message, addr):
+        message.get_uuid()
+    
+    results = {'count': count, 'subscribers': subscribers}
+    scenarios = [
+        ('inline', lambda bus: bus.subscribe(sync_callback, inline=True)),
+        ('async', lambda bus: bus.subscribe(async_callback)),
+        ('executor', lambda bus: bus.subscribe(sync_callback)),
+        ('typed_inline', lambda bus: bus.subscribe(sync_callback, [ParsedMessageType.MSEARCH], inline=True)),
+    ]
+    for name, subscribe in scenarios:
+        bus = EventBus()
+        for _ in range(subscribers):
+            # Distinct callables, as EventBus unsubscribes by identity
+            subscribe(bus)
+        runs = count // 10 if name == 'executor' else count
+        results[name] = await _publish_all(bus, messages, runs)
+    return results
+
+
+def run(count: int = 20000, subscribers: int = 8) -> dict:
+    return asyncio.run(_run(count, subscribers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--subscribers", type=int, default=8)
+    args = parser.parse_args()
+    print(json.dumps(run(args.count, args.subscribers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
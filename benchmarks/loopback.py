@@ -0,0 +1,83 @@
+"""End-to-end loopback benchmark: send -> socket -> ingest -> parse -> EventBus
+
+One SSDPService multicasts generated traffic to itself over the host's
+loopback multicast route. Each datagram carries its send time, so the
+subscriber can record one-way latency; loss is what never arrived.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from async_ssdp import SSDPService
+
+from .common import percentiles
+from .traffic import TrafficGenerator
+
+
+async def _run(count: int, port: int, pacing: float, burst: int) -> dict:
+    service = SSDPService("bench", "bench", "", multicast_port=port, ingest_queue_size=max(count, 1024))
+    latencies = []
+    done = asyncio.Event()
+    
+    def on_message(message, addr):
+        sent_at = message.get_header('X-BENCH-SENT')
+        if sent_at is not None:
+            latencies.append(time.perf_counter() - float(sent_at))
+            if len(latencies) == count:
+                done.set()
+    
+    service.subscribe(on_message, inline=True)
+    await service.start_listening()
+    
+    payloads = [data for data, _ in TrafficGenerator(seed=11, malformed=0).datagrams(min(count, 5000))]
+    started = time.perf_counter()
+    batch = []
+    for i in range(count):
+        data = payloads[i % len(payloads)]
+        # Stamp just before the closing blank line
+        batch.append(data[:-2] + f"X-BENCH-SENT: {time.perf_counter()!r}\r\n\r\n".encode())
+        if len(batch) == burst:
+            await service.send_many(batch)
+            batch = []
+            if pacing:
+                await asyncio.sleep(pacing)
+    if batch:
+        await service.send_many(batch)
+    sent_in = time.perf_counter() - started
+    
+    try:
+        await asyncio.wait_for(done.wait(), timeout=5)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - started
+    await service.close()
+    
+    return {
+        'count': count,
+        'received': len(latencies),
+        'lost': count - len(latencies),
+        'send_seconds': sent_in,
+        'throughput': len(latencies) / elapsed,
+        'latency': percentiles(latencies),
+        'ingest': service.ingest.as_dict(),
+        'transport': service.transport.stats.as_dict(),
+    }
+
+
+def run(count: int = 20000, port: int = 19100, pacing: float = 0.001, burst: int = 16) -> dict:
+    return asyncio.run(_run(count, port, pacing, burst))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--port", type=int, default=19100)
+    parser.add_argument("--pacing", type=float, default=0.001)
+    parser.add_argument("--burst", type=int, default=16)
+    args = parser.parse_args()
+    print(json.dumps(run(args.count, args.port, args.pacing, args.burst), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Parser benchmark: bytes-level MessageParser vs. the original str-based parser"""
+import argparse
+import json
+from typing import Dict, Optional
+
+from async_ssdp import CombinedMatcher, MessageFilter, MessageParser, ParsedMessageType
+
+from .common import best_time, rate
+from .traffic import TrafficGenerator
+
+SAMPLES = [
+    (
+        b"NOTIFY * HTTP/1.1\r\n"
+        b"HOST: 239.255.255.250:1900\r\n"
+        b"CACHE-CONTROL: max-age=1800\r\n"
+        b"LOCATION: http://192.168.1.20:49152/description.xml\r\n"
+        b"NT: urn:schemas-upnp-org:device:MediaRenderer:1\r\n"
+        b"NTS: ssdp:alive\r\n"
+        b"SERVER: Linux/5.10 UPnP/1.0 Renderer/1.0\r\n"
+        b"USN: uuid:4d696e69-444c-164e-9d41-b827eb000001::urn:schemas-upnp-org:device:MediaRenderer:1\r\n"
+        b"BOOTID.UPNP.ORG: 12\r\n"
+        b"CONFIGID.UPNP.ORG: 1\r\n"
+        b"\r\n"
+    ),
+    (
+        b"M-SEARCH * HTTP/1.1\r\n"
+        b"HOST: 239.255.255.250:1900\r\n"
+        b"MAN: \"ssdp:discover\"\r\n"
+        b"MX: 3\r\n"
+        b"ST: ssdp:all\r\n"
+        b"\r\n"
+    ),
+    (
+        b"HTTP/1.1 200 OK\r\n"
+        b"CACHE-CONTROL: max-age=120\r\n"
+        b"DATE: Sun, 18 Oct 2026 12:00:00 GMT\r\n"
+        b"EXT:\r\n"
+        b"LOCATION: http://192.168.1.30:8080/desc.xml\r\n"
+        b"SERVER: Linux/5.10 UPnP/1.0 Gateway/2.0\r\n"
+        b"ST: upnp:rootdevice\r\n"
+        b"USN: uuid:2fac1234-31f8-11b4-a222-08002b34c003::upnp:rootdevice\r\n"
+        b"\r\n"
+    ),
+]
+
+
+class _LegacyMessage:
+    """The original ParsedMessage lookup path"""
+    
+    def __init__(self, text: str, message_type: ParsedMessageType, headers: Dict[str, str], status_code: Optional[int]):
+        self.text = text
+        self.message_type = message_type
+        self.headers = headers
+        self.status_code = status_code
+    
+    def get_header(self, key: str, default=None):
+        key_lower = key.lower()
+        for k, v in self.headers.items():
+            if k.lower() == key_lower:
+                return v
+        return default
+    
+    def get_uuid(self) -> Optional[str]:
+        usn = self.get_header('USN')
+        if usn and usn.startswith('uuid:'):
+            parts = usn[5:].split('::')
+            return parts[0] if parts else None
+        return None
+    
+    def get_cache_control(self) -> Optional[int]:
+        cc = self.get_header('CACHE-CONTROL')
+        if cc and 'max-age=' in cc:
+            try:
+                return int(cc.split('max-age=')[1].split(',')[0].strip())
+            except (ValueError, IndexError):
+                return None
+        return None
+
+
+def _legacy_parse(data: bytes) -> Optional[_LegacyMessage]:
+    """The original str-based MessageParser.parse"""
+    text = data.decode('utf-8').strip()
+    if not text:
+        return None
+    lines = text.split('\r\n')
+    first_line = lines[0].strip()
+    message_type = ParsedMessageType.UNKNOWN
+    status_code = None
+    if first_line.startswith('NOTIFY'):
+        message_type = ParsedMessageType.NOTIFY
+    elif first_line.startswith('M-SEARCH'):
+        message_type = ParsedMessageType.MSEARCH
+    elif first_line.startswith('HTTP/1.1'):
+        message_type = ParsedMessageType.RESPONSE
+        parts = first_line.split()
+        if len(parts) >= 2:
+            try:
+                status_code = int(parts[1])
+            except ValueError:
+                pass
+    headers = {}
+    for line in lines[1:]:
+        line = line.strip()
+        if not line:
+            continue
+        if ':' in line:
+            key, value = line.split(':', 1)
+            headers[key.strip()] = value.strip()
+    return _LegacyMessage(text, message_type, headers, status_code)
+
+
+def _lookups(message):
+    # What DeviceRegistry.register and SSDPResponder read, repeated as callers do
+    for _ in range(2):
+        message.get_uuid()
+        message.get_cache_control()
+        message.get_header('LOCATION')
+        message.get_header('NT')
+
+
+def run(count: int = 100000, repeat: int = 5) -> dict:
+    parse = MessageParser.parse
+    
+    def legacy_full(data):
+        _lookups(_legacy_parse(data))
+    
+    def current_full(data):
+        _lookups(parse(data))
+    
+    def legacy_tolerant(data):
+        # The original parser's error handling, for malformed input
+        try:
+            return _legacy_parse(data)
+        except Exception:
+            return None
+    
+    traffic = TrafficGenerator(seed=3).datagrams(5000)
+    mixed = [data for data, _ in traffic]
+    # A subscriber interested in one device type, checked before parsing
+    pushdown = CombinedMatcher([
+        ([ParsedMessageType.NOTIFY, ParsedMessageType.RESPONSE],
+         MessageFilter(target="urn:schemas-upnp-org:device:MediaRenderer:1"))
+    ])
+    legacy_messages = [_legacy_parse(s) for s in SAMPLES]
+    messages = [parse(s) for s in SAMPLES]
+    
+    results = {'count': count, 'repeat': repeat}
+    for name, fn, inputs in [
+        ('legacy_parse', _legacy_parse, SAMPLES),
+        ('parse', parse, SAMPLES),
+        ('legacy_parse_and_lookup', legacy_full, SAMPLES),
+        ('parse_and_lookup', current_full, SAMPLES),
+        ('legacy_lookup', _lookups, legacy_messages),
+        ('lookup', _lookups, messages),
+        ('legacy_mixed_traffic', legacy_tolerant, mixed),
+        ('mixed_traffic', parse, mixed),
+        ('pushdown_filter', lambda item: pushdown.matches(*item), traffic),
+    ]:
+        results[name] = rate(best_time(fn, inputs, count, repeat), count)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.count, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""DeviceRegistry benchmark: registration, lookups, snapshots, change feeds and expiry sweeps at scale"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from async_ssdp import DeviceRegistry, MessageParser
+
+from .common import rate
+from .traffic import TrafficGenerator
+
+
+def run(devices: int = 20000, count: int = 100000) -> dict:
+    generator = TrafficGenerator(devices=devices, seed=7, malformed=0, mix={'notify': 0.7, 'response': 0.3})
+    messages = [(MessageParser.parse(data), addr) for data, addr in generator.datagrams(count)]
+    registry = DeviceRegistry()
+    
+    started = time.perf_counter()
+    for message, addr in messages:
+        registry.register(message, addr)
+    results = {'devices': devices, 'count': count, 'registered': len(registry),
+               'register': rate(time.perf_counter() - started, count)}
+    
+    lookups = 1000
+    started = time.perf_counter()
+    for i in range(lookups):
+        registry.get_devices_by_role("MediaRenderer")
+    results['role_lookup'] = rate(time.perf_counter() - started, lookups)
+    
+    hosts = [d['addr'][0] for d in generator.devices]
+    started = time.perf_counter()
+    for host in hosts:
+        registry.get_devices_by_address(host)
+    results['address_lookup'] = rate(time.perf_counter() - started, len(hosts))
+    
+    results.update(asyncio.run(_snapshots(registry)))
+    results.update(asyncio.run(_change_feed(messages)))
+    
+    # Nothing is due: a sweep should cost next to nothing regardless of size
+    sweeps = 1000
+    started = time.perf_counter()
+    for _ in range(sweeps):
+        registry.remove_expired()
+    results['idle_sweep'] = rate(time.perf_counter() - started, sweeps)
+    
+    # Expire everything and time the one sweep that removes it all
+    for device in registry.devices.values():
+        device['expires_at'] = 0.0
+    registry._compact()
+    started = time.perf_counter()
+    expired = registry.remove_expired()
+    results['full_sweep'] = rate(time.perf_counter() - started, max(len(expired), 1))
+    return results
+
+
+async def _snapshots(registry: DeviceRegistry) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "registry.json")
+        started = time.perf_counter()
+        saved = await registry.save(path)
+        results = {'snapshot_save': rate(time.perf_counter() - started, saved),
+                   'snapshot_bytes': os.path.getsize(path)}
+        
+        started = time.perf_counter()
+        loaded = await DeviceRegistry().load(path)
+        results['snapshot_load'] = rate(time.perf_counter() - started, max(loaded, 1))
+    return results
+
+
+async def _change_feed(messages: list) -> dict:
+    """Registration with a subscribed change feed, and how far the feed coalesced it"""
+    registry = DeviceRegistry()
+    batches = []
+    registry.subscribe_changes(batches.append, tick=0.1)
+    started = time.perf_counter()
+    for message, addr in messages:
+        registry.register(message, addr)
+    results = {'register_with_feed': rate(time.perf_counter() - started, len(messages))}
+    await asyncio.sleep(0.15)
+    results['feed_batches'] = len(batches)
+    results['feed_changes'] = sum(len(b) for b in batches)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=20000)
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.devices, args.count), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Cold-start benchmark: package import time and time to the first M-SEARCH, each in a fresh interpreter"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+
+from .common import percentiles
+
+# Each script prints the seconds it took, measured from before the first import
+_IMPORT = """
+import time
+started = time.perf_counter()
+import async_ssdp
+print(time.perf_counter() - started)
+"""
+
+_IMPORT_CLIENT = """
+import time
+started = time.perf_counter()
+from async_ssdp import SSDPClient
+print(time.perf_counter() - started)
+"""
+
+_FIRST_MSEARCH = """
+import time
+started = time.perf_counter()
+import asyncio
+from async_ssdp import SSDPClient
+
+async def main():
+    client = SSDPClient(device="bench", uuid="00000000-0000-0000-0000-000000000000",
+                        location="http://127.0.0.1/description.xml", multicast_port=%d)
+    await client.service.start_listening()
+    await client.service.broadcast_msearch("ssdp:all", 1)
+    elapsed = time.perf_counter() - started
+    await client.service.stop_listening()
+    return elapsed
+
+print(asyncio.run(main()))
+"""
+
+
+def _samples(script: str, count: int) -> list:
+    samples = []
+    for _ in range(count):
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+        samples.append(float(output.split()[-1]))
+    return samples
+
+
+def run(count: int = 20) -> dict:
+    results = {
+        'count': count,
+        'import': percentiles(_samples(_IMPORT, count), (50, 90)),
+        'import_client': percentiles(_samples(_IMPORT_CLIENT, count), (50, 90)),
+    }
+    # A random high port so a real SSDP stack on 1900 doesn't get the searches
+    port = random.randint(20000, 60000)
+    try:
+        results['first_msearch'] = percentiles(_samples(_FIRST_MSEARCH % port, count), (50, 90))
+    except subprocess.CalledProcessError as e:
+        # No multicast on this host
+        results['first_msearch'] = {'error': e.stderr.strip().splitlines()[-1]}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.count), indent=2))
+
+
+if __name__ == "__main__":
+    main()
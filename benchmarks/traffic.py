@@ -0,0 +1,163 @@
+"""Reproducible synthetic SSDP traffic
+
+TrafficGenerator produces NOTIFY (alive/byebye), M-SEARCH and search
+responses with the header mixes seen on real segments: UDA 1.1 extras,
+vendor headers, odd header-name casing and spacing, plus a configurable
+share of malformed datagrams. The same seed always yields the same stream.
+"""
+import random
+from typing import Dict, Iterator, List, Optional, Tuple
+
+Datagram = Tuple[bytes, Tuple[str, int]]
+
+DEVICE_TYPES = [
+    "urn:schemas-upnp-org:device:MediaRenderer:1",
+    "urn:schemas-upnp-org:device:MediaServer:1",
+    "urn:schemas-upnp-org:device:InternetGatewayDevice:1",
+    "urn:schemas-upnp-org:device:Basic:1",
+    "urn:dial-multiscreen-org:device:dial:1",
+    "urn:schemas-upnp-org:device:miner:1",
+]
+SERVICE_TYPES = [
+    "urn:schemas-upnp-org:service:AVTransport:1",
+    "urn:schemas-upnp-org:service:ContentDirectory:1",
+    "urn:schemas-upnp-org:service:WANIPConnection:1",
+]
+SERVERS = [
+    "Linux/5.10 UPnP/1.0 MediaRenderer/2.1",
+    "Windows/10.0 UPnP/1.1 DLNADOC/1.50",
+    "FreeRTOS/10 UPnP/1.0 Gateway/3.0",
+    "Linux/#1 SMP PREEMPT_DYNAMIC UPnp/1.0 miner/1.0",
+]
+DEFAULT_MIX = {'notify': 0.55, 'byebye': 0.05, 'msearch': 0.15, 'response': 0.25}
+
+
+class TrafficGenerator:
+    """Seeded generator of SSDP datagrams from a fixed population of devices"""
+    
+    def __init__(self, devices: int = 1000, seed: int = 1900, mix: Optional[Dict[str, float]] = None,
+                 malformed: float = 0.02, subnet: str = "192.168"):
+        self.random = random.Random(seed)
+        self.mix = mix or DEFAULT_MIX
+        self.malformed = malformed
+        self.devices = [self._device(i, subnet) for i in range(devices)]
+        self._kinds = list(self.mix)
+        self._weights = [self.mix[k] for k in self._kinds]
+    
+    def datagrams(self, count: int) -> List[Datagram]:
+        return list(self.stream(count))
+    
+    def stream(self, count: int) -> Iterator[Datagram]:
+        for _ in range(count):
+            if self.malformed and self.random.random() < self.malformed:
+                yield self.malformed_datagram(), self._searcher()
+                continue
+            kind = self.random.choices(self._kinds, self._weights)[0]
+            device = self.random.choice(self.devices)
+            if kind == 'msearch':
+                yield self.msearch(), self._searcher()
+            elif kind == 'response':
+                yield self.response(device), device['addr']
+            else:
+                yield self.notify(device, 'ssdp:byebye' if kind == 'byebye' else 'ssdp:alive'), device['addr']
+    
+    def notify(self, device: dict, nts: str = 'ssdp:alive') -> bytes:
+        nt = self.random.choice(device['targets'])
+        headers = [
+            ("HOST", "239.255.255.250:1900"),
+            ("NT", nt),
+            ("NTS", nts),
+            ("USN", self._usn(device, nt)),
+        ]
+        if nts == 'ssdp:alive':
+            headers += [
+                ("CACHE-CONTROL", f"max-age={device['max_age']}"),
+                ("LOCATION", device['location']),
+                ("SERVER", device['server']),
+            ]
+        headers += self._extras(device)
+        return self._render("NOTIFY * HTTP/1.1", headers)
+    
+    def msearch(self, target: Optional[str] = None) -> bytes:
+        st = target or self.random.choice(["ssdp:all", "upnp:rootdevice"] + DEVICE_TYPES)
+        headers = [
+            ("HOST", "239.255.255.250:1900"),
+            ("MAN", "\"ssdp:discover\""),
+            ("MX", str(self.random.randint(1, 5))),
+            ("ST", st),
+        ]
+        if self.random.random() < 0.3:
+            headers.append(("USER-AGENT", "Android/13 UPnP/1.1 ControlPoint/1.0"))
+        return self._render("M-SEARCH * HTTP/1.1", headers)
+    
+    def response(self, device: dict) -> bytes:
+        st = self.random.choice(device['targets'])
+        headers = [
+            ("CACHE-CONTROL", f"max-age={device['max_age']}"),
+            ("DATE", "Sun, 18 Oct 2026 12:00:00 GMT"),
+            ("EXT", ""),
+            ("LOCATION", device['location']),
+            ("SERVER", device['server']),
+            ("ST", st),
+            ("USN", self._usn(device, st)),
+        ] + self._extras(device)
+        return self._render("HTTP/1.1 200 OK", headers)
+    
+    def malformed_datagram(self) -> bytes:
+        choice = self.random.randrange(6)
+        if choice == 0:
+            return b""
+        if choice == 1:
+            return bytes(self.random.getrandbits(8) for _ in range(self.random.randint(1, 300)))
+        if choice == 2:
+            return self.notify(self.random.choice(self.devices))[:self.random.randint(5, 60)]
+        if choice == 3:
+            return b"NOTIFY * HTTP/1.1\r\nHOST 239.255.255.250:1900\r\nNT urn:broken\r\n\r\n"
+        if choice == 4:
+            return b"M-SEARCH * HTTP/1.1\r\nST: \xff\xfe\xfd\r\nMX: x\r\n\r\n"
+        return b"\r\n\r\n\r\n"
+    
+    def _device(self, index: int, subnet: str) -> dict:
+        rnd = self.random
+        device_type = rnd.choice(DEVICE_TYPES)
+        host = f"{subnet}.{index // 250 % 250 + 1}.{index % 250 + 1}"
+        return {
+            'uuid': f"{rnd.getrandbits(32):08x}-{rnd.getrandbits(16):04x}-{rnd.getrandbits(16):04x}-"
+                    f"{rnd.getrandbits(16):04x}-{rnd.getrandbits(48):012x}",
+            'targets': ["upnp:rootdevice", device_type] + rnd.sample(SERVICE_TYPES, rnd.randint(0, 2)),
+            'location': f"http://{host}:{rnd.choice([80, 1400, 8080, 49152])}/description.xml",
+            'server': rnd.choice(SERVERS),
+            'max_age': rnd.choice([120, 300, 1800]),
+            'boot_id': rnd.randint(1, 1000),
+            'addr': (host, 1900),
+        }
+    
+    def _extras(self, device: dict) -> List[Tuple[str, str]]:
+        extras = []
+        if self.random.random() < 0.5:
+            extras += [("BOOTID.UPNP.ORG", str(device['boot_id'])), ("CONFIGID.UPNP.ORG", "1")]
+        if self.random.random() < 0.2:
+            extras.append(("01-NLS", f"{self.random.getrandbits(64):016x}"))
+            extras.append(("OPT", "\"http://schemas.upnp.org/upnp/1/0/\"; ns=01"))
+        return extras
+    
+    def _render(self, start_line: str, headers: List[Tuple[str, str]]) -> bytes:
+        lines = [start_line]
+        for name, value in headers:
+            # Real stacks disagree on header-name casing and spacing after the colon
+            roll = self.random.random()
+            if roll < 0.1:
+                name = name.lower()
+            elif roll < 0.15:
+                name = name.title()
+            lines.append(f"{name}:{'' if roll > 0.9 else ' '}{value}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8")
+    
+    def _searcher(self) -> Tuple[str, int]:
+        return (f"10.0.{self.random.randint(0, 3)}.{self.random.randint(1, 254)}", self.random.randint(30000, 60000))
+    
+    @staticmethod
+    def _usn(device: dict, target: str) -> str:
+        if target == device['uuid']:
+            return f"uuid:{device['uuid']}"
+        return f"uuid:{device['uuid']}::{target}"
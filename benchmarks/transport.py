@@ -0,0 +1,94 @@
+"""Send-path benchmark: persistent sender endpoint vs. one socket per message"""
+import argparse
+import asyncio
+import json
+import socket
+import struct
+import time
+
+from async_ssdp import MulticastTransport
+
+MESSAGE = (
+    "NOTIFY * HTTP/1.0\r\n"
+    "HOST: 239.255.255.250:1900\r\n"
+    "NT: urn:schemas-upnp-org:device:bench:1\r\n"
+    "NTS: ssdp:alive\r\n"
+    "LOCATION: http://127.0.0.1:8080/description.xml\r\n"
+    "USN: uuid:00000000-0000-0000-0000-000000000000::urn:schemas-upnp-org:device:bench:1\r\n"
+    "CACHE-CONTROL: max-age=1800\r\n"
+    "\r\n"
+)
+
+
+async def _legacy_send(group: str, port: int, message: str):
+    """The pre-endpoint send path: executor hop plus socket setup per datagram"""
+    loop = asyncio.get_event_loop()
+    
+    def _send():
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        ttl = struct.pack("b", 1)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        sock.sendto(message.encode("utf-8"), (group, port))
+        sock.close()
+    
+    await loop.run_in_executor(None, _send)
+
+
+async def bench_legacy(group: str, port: int, count: int) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(count):
+        t0 = time.perf_counter()
+        await _legacy_send(group, port, MESSAGE)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    return {
+        'packets_sent': count,
+        'avg_send_latency': sum(latencies) / count,
+        'max_send_latency': max(latencies),
+        'packets_per_second': count / elapsed,
+    }
+
+
+async def bench_persistent(group: str, port: int, count: int) -> dict:
+    transport = MulticastTransport(group, port)
+    payload = MESSAGE.encode("utf-8")
+    await transport.start_sender()
+    try:
+        for _ in range(count):
+            await transport.send(payload)
+    finally:
+        transport.close()
+    return transport.stats.as_dict()
+
+
+async def _run(group: str, port: int, count: int) -> dict:
+    # Sink socket so unicast targets don't answer with ICMP port-unreachable
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", port))
+    try:
+        return {
+            'count': count,
+            'target': f"{group}:{port}",
+            'legacy': await bench_legacy(group, port, count),
+            'persistent': await bench_persistent(group, port, count),
+        }
+    finally:
+        sink.close()
+
+
+def run(group: str = "127.0.0.1", port: int = 19000, count: int = 5000) -> dict:
+    return asyncio.run(_run(group, port, count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--group", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=19000)
+    parser.add_argument("--count", type=int, default=5000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.group, args.port, args.count), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import asyncio
+
+from async_ssdp import MessageBuilder, SimulatedFabric, SSDPClient, SSDPServer
+
+
+def test_announcements_do_not_drive_convergence():
+    async def main():
+        fabric = SimulatedFabric()
+        server = SSDPServer("miner", "m-0", "http://x/0", transport=fabric.create_transport())
+        client = SSDPClient(device="client", uuid="client", location="", transport=fabric.create_transport())
+        noisy = fabric.create_transport()
+        
+        async def announce():
+            # A stream of other devices' NOTIFYs, a new one every few milliseconds
+            for i in range(10000):
+                builder = MessageBuilder("lamp", f"n-{i}", "http://n", "urn:schemas-upnp-org",
+                                         "239.255.255.250", 1900)
+                await noisy.send(builder.build_notify("ssdp:alive"))
+                await asyncio.sleep(0.005)
+        
+        await server.start()
+        announcer = asyncio.create_task(announce())
+        try:
+            discovery = await client.start_continuous(min_mx=1, max_mx=1, backoff=0.1, settle_rounds=1)
+            for _ in range(60):
+                if discovery.converged:
+                    break
+                await asyncio.sleep(0.1)
+            assert discovery.converged
+            assert discovery.discovered == 1  # the server; announcements are not answers
+            assert len(client.registry) > 1
+        finally:
+            announcer.cancel()
+            await client.close()
+            await server.stop()
+    
+    asyncio.run(main())
+
+
+def test_survives_a_failing_search():
+    async def main():
+        fabric = SimulatedFabric()
+        client = SSDPClient(device="client", uuid="client", location="", transport=fabric.create_transport())
+        broadcast_msearch = client.service.broadcast_msearch
+        failures = [RuntimeError("unexpected"), OSError("network down")]
+        
+        async def flaky(*args, **kwargs):
+            if failures:
+                raise failures.pop()
+            await broadcast_msearch(*args, **kwargs)
+        
+        client.service.broadcast_msearch = flaky
+        try:
+            discovery = await client.start_continuous(min_mx=1, max_mx=1, max_backoff=0.1, settle_rounds=1)
+            for _ in range(60):
+                if discovery.converged:
+                    break
+                await asyncio.sleep(0.1)
+            assert discovery.converged
+            assert not discovery._task.done()
+        finally:
+            await client.close()
+    
+    asyncio.run(main())
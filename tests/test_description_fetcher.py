@@ -0,0 +1,150 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from async_ssdp import DescriptionFetcher
+
+XML = b"""<?xml version="1.0"?>
+<root xmlns="urn:schemas-upnp-org:device-1-0">
+  <specVersion><major>1</major><minor>0</minor></specVersion>
+  <device>
+    <friendlyName>Lamp</friendlyName>
+    <serviceList>
+      <service><serviceType>urn:schemas-upnp-org:service:SwitchPower:1</serviceType></service>
+      <service><serviceType>urn:schemas-upnp-org:service:Dimming:1</serviceType></service>
+    </serviceList>
+  </device>
+</root>"""
+
+JSON = b'{"device": {"friendlyName": "Miner"}}'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get('If-None-Match')))
+        self.server.connections.add(self.client_address)
+        if self.path == "/lamp.xml":
+            if self.headers.get('If-None-Match') == '"v1"':
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/xml")
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(XML)))
+            self.end_headers()
+            self.wfile.write(XML)
+        elif self.path == "/miner.json":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for chunk in (JSON[:10], JSON[10:]):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_error(404)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.requests = []
+    httpd.connections = set()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _url(server, path: str) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_fetches_xml_and_chunked_json_over_one_connection(server):
+    async def main():
+        fetcher = DescriptionFetcher(per_host=1)
+        try:
+            lamp = await fetcher.fetch(_url(server, "/lamp.xml"))
+            miner = await fetcher.fetch(_url(server, "/miner.json"))
+        finally:
+            await fetcher.close()
+        assert lamp['device']['friendlyName'] == "Lamp"
+        assert [s['serviceType'] for s in lamp['device']['serviceList']['service']] == [
+            "urn:schemas-upnp-org:service:SwitchPower:1", "urn:schemas-upnp-org:service:Dimming:1"]
+        assert miner == {'device': {'friendlyName': "Miner"}}
+        assert fetcher.pool.opened == 1
+        assert fetcher.pool.reused == 1
+        assert len(server.connections) == 1
+    
+    asyncio.run(main())
+
+
+def test_serves_from_cache_then_revalidates(server):
+    async def main():
+        fetcher = DescriptionFetcher()
+        url = _url(server, "/lamp.xml")
+        try:
+            first = await fetcher.fetch(url, max_age=60)
+            assert await fetcher.fetch(url, max_age=60) is first
+            assert len(server.requests) == 1
+            
+            fetcher._cache[url].expires_at = 0  # let it expire
+            assert await fetcher.fetch(url, max_age=60) is first
+        finally:
+            await fetcher.close()
+        assert server.requests[-1] == ("/lamp.xml", '"v1"')
+        assert (fetcher.fetched, fetcher.hits, fetcher.revalidated) == (1, 1, 1)
+    
+    asyncio.run(main())
+
+
+def test_reboot_refetches_without_validators(server):
+    async def main():
+        fetcher = DescriptionFetcher()
+        url = _url(server, "/lamp.xml")
+        try:
+            await fetcher.fetch(url, max_age=60, boot_id=1)
+            assert fetcher.cached(url, boot_id=2) is None
+            await fetcher.fetch(url, max_age=60, boot_id=2)
+        finally:
+            await fetcher.close()
+        assert server.requests == [("/lamp.xml", None), ("/lamp.xml", None)]
+        assert fetcher.fetched == 2
+    
+    asyncio.run(main())
+
+
+def test_concurrent_fetches_share_one_request(server):
+    async def main():
+        fetcher = DescriptionFetcher()
+        try:
+            results = await asyncio.gather(*[fetcher.fetch(_url(server, "/lamp.xml")) for _ in range(5)])
+        finally:
+            await fetcher.close()
+        assert all(r is results[0] for r in results)
+        assert len(server.requests) == 1
+    
+    asyncio.run(main())
+
+
+def test_failures_return_none(server):
+    async def main():
+        fetcher = DescriptionFetcher(timeout=1.0)
+        try:
+            assert await fetcher.fetch(_url(server, "/missing.xml")) is None
+            assert await fetcher.fetch("ftp://127.0.0.1/lamp.xml") is None
+        finally:
+            await fetcher.close()
+        assert fetcher.failures == 2
+    
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import pytest
+
+from async_ssdp import DeviceRegistry, SimulatedFabric, SSDPClient, SSDPServer
+
+
+def _kinds(batches):
+    return [[kind for kind, _ in batch] for batch in batches]
+
+
+def test_only_location_or_host_changes_are_updates():
+    async def main():
+        registry = DeviceRegistry()
+        batches = []
+        registry.subscribe_changes(batches.append, tick=0.01)
+        registry.update("d", "uuid:d::upnp:rootdevice", "http://10.0.0.1/d.xml", "upnp:rootdevice", 1800,
+                        ("10.0.0.1", 1900))
+        await asyncio.sleep(0.02)
+        # Another NT, then a search response from an ephemeral port: same device
+        registry.update("d", "uuid:d", "http://10.0.0.1/d.xml", "uuid:d", 1800, ("10.0.0.1", 1900))
+        registry.update("d", "uuid:d::urn:schemas-upnp-org:device:Basic:1", "http://10.0.0.1/d.xml",
+                        "urn:schemas-upnp-org:device:Basic:1", 1800, ("10.0.0.1", 50123))
+        await asyncio.sleep(0.02)
+        assert _kinds(batches) == [["added"]]
+        
+        registry.update("d", "uuid:d", "http://10.0.0.1/other.xml", "uuid:d", 1800, ("10.0.0.1", 1900))
+        await asyncio.sleep(0.02)
+        registry.update("d", "uuid:d", "http://10.0.0.1/other.xml", "uuid:d", 1800, ("10.0.0.2", 1900))
+        await asyncio.sleep(0.02)
+        assert _kinds(batches) == [["added"], ["updated"], ["updated"]]
+    
+    asyncio.run(main())
+
+
+def test_unchanged_server_produces_no_updates():
+    async def main():
+        fabric = SimulatedFabric()
+        server = SSDPServer("miner", "m-0", "http://x/0", transport=fabric.create_transport())
+        client = SSDPClient(device="client", uuid="client", location="", transport=fabric.create_transport())
+        batches = []
+        client.registry.subscribe_changes(batches.append, tick=0.01)
+        await client._ensure_subscribed()
+        await server.start()
+        try:
+            for _ in range(3):
+                await server.service.broadcast_alive()
+                await client.discover("urn:schemas-upnp-org:device:miner:1", timeout=1, max_devices=1)
+                await asyncio.sleep(0.05)
+        finally:
+            await client.close()
+            await server.stop()
+        assert _kinds(batches) == [["added"]]
+    
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_hands_out_plain_dicts(compact):
+    async def main():
+        registry = DeviceRegistry(compact=compact)
+        batches = []
+        registry.subscribe_changes(batches.append, tick=0.01)
+        registered = registry.update("d", "uuid:d::upnp:rootdevice", "http://10.0.0.1/d.xml", "upnp:rootdevice",
+                                     1800, ("10.0.0.1", 1900))
+        await asyncio.sleep(0.02)
+        devices = [registered, registry.get_device("d"), registry.get_device_by_usn("uuid:d::upnp:rootdevice"),
+                   *registry.get_devices_by_role("rootdevice"), *registry.get_devices_by_address("10.0.0.1"),
+                   *registry.get_expiring(3600), *registry.get_all_devices(), batches[0][0][1]]
+        for device in devices:
+            assert type(device) is dict
+            assert device.copy() == device
+            assert device['usn'] == "uuid:d::upnp:rootdevice"
+        json.dumps(registry.get_all_devices())
+        assert type(registry.remove("d")) is dict
+    
+    asyncio.run(main())
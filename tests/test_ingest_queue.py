@@ -0,0 +1,32 @@
+import asyncio
+
+from async_ssdp import IngestQueue
+
+
+def test_fair_share_overflow_empties_a_host():
+    async def main():
+        queue = IngestQueue(2, "fair_share")
+        assert queue.put_nowait(b"a", ("10.0.0.1", 1900))
+        assert queue.put_nowait(b"b", ("10.0.0.2", 1900))
+        # Full: the newcomer's host is empty, so one of the others is trimmed to nothing
+        assert queue.put_nowait(b"c", ("10.0.0.3", 1900))
+        assert queue.qsize() == 2
+        assert queue.dropped == 1
+        received = [(await queue.get())[0] for _ in range(2)]
+        assert sorted(received) in ([b"a", b"c"], [b"b", b"c"])
+        assert queue.qsize() == 0
+    
+    asyncio.run(main())
+
+
+def test_fair_share_trims_the_noisiest_host():
+    async def main():
+        queue = IngestQueue(4, "fair_share")
+        for i in range(4):
+            queue.put_nowait(b"noisy%d" % i, ("10.0.0.1", 1900))
+        assert queue.put_nowait(b"quiet", ("10.0.0.2", 1900))
+        received = [(await queue.get())[0] for _ in range(4)]
+        assert b"quiet" in received
+        assert b"noisy3" not in received
+    
+    asyncio.run(main())
@@ -0,0 +1,48 @@
+import asyncio
+
+from async_ssdp import SimulatedFabric, SSDPClient, SSDPServer
+
+
+def test_listener_reachable_at_its_multicast_port():
+    async def main():
+        fabric = SimulatedFabric()
+        listener = fabric.create_transport()
+        sender = fabric.create_transport()
+        received = []
+        await listener.start_listener(lambda data, addr: received.append((data, addr)))
+        
+        host = listener.address[0]
+        await sender.send(b"hello", (host, listener.multicast_port))
+        await asyncio.sleep(0)
+        assert received == [(b"hello", sender.address)]
+        
+        listener.stop_listener()
+        await sender.send(b"gone", (host, listener.multicast_port))
+        await asyncio.sleep(0)
+        assert len(received) == 1
+    
+    asyncio.run(main())
+
+
+def test_verify_reaches_devices_by_unicast():
+    async def main():
+        fabric = SimulatedFabric()
+        servers = [SSDPServer("miner", f"m-{i}", f"http://x/{i}", transport=fabric.create_transport())
+                   for i in range(2)]
+        client = SSDPClient(device="client", uuid="client", location="", transport=fabric.create_transport())
+        await client._ensure_subscribed()
+        for server in servers:
+            await server.start()
+        await asyncio.sleep(0.3)  # initial announcements
+        assert len(client.registry) == 2
+        
+        # The second device drops off the network without saying byebye
+        servers[1].service.transport.stop_listener()
+        unanswered = await client.verify(within=3600, timeout=1)
+        assert unanswered == ["m-1"]
+        
+        await client.close()
+        for server in servers:
+            await server.stop()
+    
+    asyncio.run(main())
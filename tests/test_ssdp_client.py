@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from async_ssdp import MessageBuilder, MessageParser, SimulatedFabric, SSDPClient, SSDPServer
+
+MINER = "urn:schemas-upnp-org:device:miner:1"
+
+
+async def _segment(count: int):
+    fabric = SimulatedFabric()
+    servers = [SSDPServer("miner", f"m-{i}", f"http://x/{i}", transport=fabric.create_transport())
+               for i in range(count)]
+    for server in servers:
+        await server.start()
+    client = SSDPClient(device="client", uuid="client", location="", transport=fabric.create_transport())
+    return client, servers
+
+
+async def _teardown(client, servers):
+    await client.close()
+    for server in servers:
+        await server.stop()
+
+
+def test_response_echoes_search_target():
+    builder = MessageBuilder("miner", "m-0", "http://x/0", "urn:schemas-upnp-org", "239.255.255.250", 1900)
+    response = MessageParser.parse(builder.build_msearch_response(MINER))
+    assert response.get_search_target() == MINER
+
+
+def test_discover_iter_finds_servers_by_device_type():
+    async def main():
+        client, servers = await _segment(3)
+        try:
+            found = [d['uuid'] async for d in client.discover_iter(MINER, timeout=1, retransmit=1)]
+        finally:
+            await _teardown(client, servers)
+        assert sorted(found) == ["m-0", "m-1", "m-2"]
+    
+    asyncio.run(main())
+
+
+def test_discover_stops_at_max_devices():
+    async def main():
+        client, servers = await _segment(3)
+        try:
+            started = time.monotonic()
+            await client.discover(MINER, timeout=3, max_devices=1)
+            elapsed = time.monotonic() - started
+        finally:
+            await _teardown(client, servers)
+        assert elapsed < 3
+    
+    asyncio.run(main())
+
+
+def test_discover_iter_skips_devices_not_searched_for():
+    async def main():
+        client, servers = await _segment(3)
+        try:
+            found = [d['uuid'] async for d in client.discover_iter("uuid:m-1", timeout=1, max_devices=1)]
+        finally:
+            await _teardown(client, servers)
+        assert found == ["m-1"]
+    
+    asyncio.run(main())